@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Adds ETags to API responses and answers matching If-None-Match with 304
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -150,10 +152,17 @@ CORS_ALLOW_ALL_ORIGINS = True  # For development only
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+# Stored results are only read by chords; expire them after an hour instead of a day
+CELERY_RESULT_EXPIRES = config('CELERY_RESULT_EXPIRES', default=3600, cast=int)
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Tasks are long and I/O bound: hand each worker process one task at a time
+# and acknowledge only after it finishes, so idle processes pick up queued work
+CELERY_WORKER_PREFETCH_MULTIPLIER = config('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1, cast=int)
+CELERY_TASK_ACKS_LATE = config('CELERY_TASK_ACKS_LATE', default=True, cast=bool)
+CELERY_WORKER_CONCURRENCY = config('CELERY_WORKER_CONCURRENCY', default=8, cast=int)
 
 # External API Configuration
 COASTAL_DATA_APIS = {
@@ -167,6 +176,54 @@ COASTAL_DATA_APIS = {
     }
 }
 
+# Concurrent API requests (and HTTP connections) during ingestion
+INGESTION_MAX_WORKERS = config('INGESTION_MAX_WORKERS', default=8, cast=int)
+# Rows per INSERT when writing ingested sensor readings
+SENSOR_DATA_BATCH_SIZE = config('COASTAL_BULK_BATCH', default=500, cast=int)
+# Set SENSOR_DATA_BUFFER_URL (e.g. redis://localhost:6379/2) to queue readings posted
+# to the API in Redis and insert them in batches from flush_sensor_buffer instead
+SENSOR_DATA_BUFFER_URL = config('SENSOR_DATA_BUFFER_URL', default='')
+SENSOR_DATA_BUFFER_KEY = config('SENSOR_DATA_BUFFER_KEY', default='sensor_data_buffer')
+# Seconds between flush_sensor_buffer runs scheduled by Celery beat
+SENSOR_DATA_BUFFER_FLUSH_INTERVAL = config('SENSOR_DATA_BUFFER_FLUSH_INTERVAL', default=2.0, cast=float)
+if SENSOR_DATA_BUFFER_URL:
+    CELERY_BEAT_SCHEDULE = {
+        'flush-sensor-buffer': {
+            'task': 'monitoring.tasks.flush_sensor_buffer',
+            'schedule': SENSOR_DATA_BUFFER_FLUSH_INTERVAL,
+        },
+    }
+
+# Cache Configuration
+# Set REDIS_CACHE_URL (e.g. redis://localhost:6379/1) to share the cache between
+# the web and Celery processes; otherwise each process has its own local cache
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a rendered dashboard overview is served from the cache
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=30, cast=int)
+# Seconds a rendered health check response is served from the cache
+HEALTH_CHECK_CACHE_TIMEOUT = config('HEALTH_CHECK_CACHE_TIMEOUT', default=5, cast=int)
+
 # ML Model Configuration
 ML_MODEL_PATH = BASE_DIR / 'ml_models'
 ALERT_THRESHOLD = 0.7  # Risk threshold for triggering alerts
+# Score the flattened forest on rank-coded int16 features (same routing, needs numba)
+ML_QUANTIZED_TREES = config('ML_QUANTIZED_TREES', default=False, cast=bool)
+# 0 parallelises each prediction over trees; N > 1 scores batches of locations
+# on N threads with a single-threaded kernel (better for many locations, few trees)
+ML_N_THREADS = config('ML_N_THREADS', default=0, cast=int)
+# Seconds a cached prediction is served while a location has no newer reading
+PREDICTION_CACHE_TIMEOUT = config('PREDICTION_CACHE_TIMEOUT', default=600, cast=int)
@@ -16,6 +16,8 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'coastal_backend.settings')
 django.setup()
 
+from ml_integration.fast_rf import save_forest
+
 def create_dummy_model():
     """Create a dummy ML model for testing purposes"""
     
@@ -66,11 +68,16 @@ def create_dummy_model():
         n_estimators=100,
         max_depth=10,
         random_state=42,
-        class_weight='balanced'
+        class_weight='balanced',
+        n_jobs=-1  # trees are independent, so build them on every core
     )
     
     model.fit(X_train, y_train)
     
+    # Serving scores one batch of locations at a time, where joblib's thread
+    # pool costs more than it saves; don't carry n_jobs into the saved model
+    model.set_params(n_jobs=None)
+    
     # Test the model
     train_score = model.score(X_train, y_train)
     test_score = model.score(X_test, y_test)
@@ -78,14 +85,46 @@ def create_dummy_model():
     print(f"Model training score: {train_score:.3f}")
     print(f"Model test score: {test_score:.3f}")
     
-    # Save the model
+    # Save the model. Estimators stay in pickle/npz; tabular artifacts such as
+    # the training frame go to Feather, which keeps dtypes and is far faster
+    # and smaller than CSV for numeric data
     model_dir = 'ml_models'
     os.makedirs(model_dir, exist_ok=True)
     model_path = os.path.join(model_dir, 'coastal_risk_model.pkl')
     
+    # Keep the training data so the model can be retrained or audited later
+    try:
+        training_path = os.path.join(model_dir, 'coastal_training_data.feather')
+        df.assign(risk_label=y).to_feather(training_path, compression='zstd')
+        print(f"Training data saved to: {training_path}")
+    except ImportError:
+        print("pyarrow not installed, skipping training data export")
+    
     joblib.dump(model, model_path)
     print(f"Model saved to: {model_path}")
     
+    # Export an ONNX copy for onnxruntime serving when the converter is available
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        print("skl2onnx not installed, skipping ONNX export")
+    else:
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=[('input', FloatTensorType([None, len(feature_columns)]))],
+            options={id(model): {'zipmap': False}}
+        )
+        onnx_path = os.path.join(model_dir, 'coastal_risk_model.onnx')
+        with open(onnx_path, 'wb') as f:
+            f.write(onnx_model.SerializeToString())
+        print(f"ONNX model saved to: {onnx_path}")
+    
+    # Save the flattened tree arrays, which load without unpickling an estimator
+    npz_path = os.path.join(model_dir, 'coastal_risk_model.npz')
+    save_forest(npz_path, model)
+    print(f"Tree arrays saved to: {npz_path}")
+    
     # Test the model with sample data
     sample_features = pd.DataFrame([{
         'water_level': 3.5,
@@ -22,15 +22,19 @@ from monitoring.models import CoastalLocation
 def test_model_loading(model_path):
     """Test if a model can be loaded successfully"""
     try:
-        # Try joblib first
+        # Try pickle first (joblib dumps unpickle to a bare array, not a model)
         try:
-            model = joblib.load(model_path)
-            print(f"✓ Model loaded successfully with joblib")
-        except:
-            # Try pickle
             with open(model_path, 'rb') as f:
                 model = pickle.load(f)
+        except Exception:
+            model = None
+        
+        if hasattr(model, 'predict_proba'):
             print(f"✓ Model loaded successfully with pickle")
+        else:
+            # Fall back to joblib
+            model = joblib.load(model_path, mmap_mode='r')
+            print(f"✓ Model loaded successfully with joblib")
         
         # Check if model has predict_proba method
         if hasattr(model, 'predict_proba'):
@@ -117,9 +121,9 @@ def test_full_integration():
         
         if prediction:
             print(f"✓ Full integration test successful!")
-            print(f"  Risk Level: {prediction['risk_level']}")
-            print(f"  Risk Score: {prediction['risk_score']:.3f}")
-            print(f"  Confidence: {prediction['confidence']:.3f}")
+            print(f"  Risk Level: {prediction.risk_level}")
+            print(f"  Risk Score: {prediction.risk_score:.3f}")
+            print(f"  Confidence: {prediction.confidence:.3f}")
             return True
         else:
             print("✗ Full integration test failed")
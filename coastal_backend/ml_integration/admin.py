@@ -14,6 +14,7 @@ class MLModelAdmin(admin.ModelAdmin):
 class PredictionLogAdmin(admin.ModelAdmin):
     list_display = ['model', 'location', 'execution_time', 'created_at']
     list_filter = ['model', 'created_at']
+    list_select_related = ['model', 'location']
     search_fields = ['location__name', 'model__name']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
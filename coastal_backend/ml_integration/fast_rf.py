@@ -0,0 +1,249 @@
+"""
+Flattened tree-ensemble inference for the coastal risk model.
+
+A fitted sklearn forest is walked once and every tree is concatenated into
+flat node arrays (feature, threshold, left, right, value) plus the index of
+each tree's root. Predictions then run in a compiled Numba loop instead of
+going through sklearn's per-call Python dispatch, which dominates the cost
+of scoring one location at a time.
+
+Numba is optional; callers should check NUMBA_AVAILABLE and keep using the
+sklearn estimator when it is not installed. Forests saved to .npz (see
+save_forest) can still be scored without it, through a vectorised NumPy
+traversal, so inference never needs sklearn or an unpickling step.
+
+Forests can optionally be quantized to int16 by rank: each split threshold
+is replaced by its index among that feature's sorted distinct thresholds,
+and each input by the number of those thresholds strictly below it. Then
+``x <= threshold`` exactly when ``code(x) <= code(threshold)``, so routing
+is identical to the float forest while halving the bytes touched per
+comparison. A feature may have at most 32767 distinct thresholds.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def is_flattenable(model) -> bool:
+    """Whether the estimator is a fitted forest of sklearn decision trees"""
+    estimators = getattr(model, 'estimators_', None)
+    return bool(estimators) and all(hasattr(estimator, 'tree_') for estimator in estimators)
+
+
+def flatten_forest(model) -> dict:
+    """Concatenate the trees of a fitted forest into flat node arrays"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        roots.append(offset)
+        features.append(tree.feature)
+        thresholds.append(tree.threshold)
+        # Make child indices absolute; leaves keep -1
+        lefts.append(np.where(tree.children_left >= 0, tree.children_left + offset, -1))
+        rights.append(np.where(tree.children_right >= 0, tree.children_right + offset, -1))
+        # Normalise each node's class weights to probabilities, as tree.predict_proba does
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+        offset += tree.node_count
+
+    return {
+        'feature': np.concatenate(features).astype(np.int64),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.int64),
+        'right': np.concatenate(rights).astype(np.int64),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int64),
+        'n_features': np.asarray(model.n_features_in_, dtype=np.int64),
+    }
+
+
+def save_forest(path: str, model) -> None:
+    """Write a fitted forest's flat node arrays to an uncompressed .npz file"""
+    np.savez(path, **flatten_forest(model))
+
+
+def load_forest(path: str) -> dict:
+    """Read flat node arrays written by save_forest"""
+    # .npz members are zip entries and cannot be memory-mapped; they are read
+    # straight into arrays without any unpickling (allow_pickle stays off)
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+_QUANT_MAX_THRESHOLDS = np.iinfo(np.int16).max
+
+
+def quantize_forest(arrays: dict, n_features: int) -> dict:
+    """Add rank-coded int16 thresholds plus each feature's sorted distinct thresholds
+
+    The distinct thresholds are stored concatenated in ``quant_values``, with
+    feature f's slice at ``quant_offsets[f]:quant_offsets[f + 1]``.
+    """
+    feature = arrays['feature']
+    threshold = arrays['threshold']
+    split = feature >= 0
+
+    values, offsets = [], [0]
+    quantized = np.zeros(threshold.shape[0], dtype=np.int16)
+    for f in range(n_features):
+        nodes = split & (feature == f)
+        uniq, codes = np.unique(threshold[nodes], return_inverse=True)
+        if uniq.size > _QUANT_MAX_THRESHOLDS:
+            raise ValueError(f"Feature {f} has {uniq.size} distinct thresholds; int16 codes allow {_QUANT_MAX_THRESHOLDS}")
+        quantized[nodes] = codes
+        values.append(uniq)
+        offsets.append(offsets[-1] + uniq.size)
+
+    return dict(
+        arrays,
+        threshold_q=quantized,
+        quant_values=np.concatenate(values).astype(np.float64),
+        quant_offsets=np.asarray(offsets, dtype=np.int64),
+    )
+
+
+def _quantize(X, values, offsets):
+    """Code each input as the number of its feature's thresholds strictly below it"""
+    # Compare in float32 like sklearn, against the float64 thresholds
+    X = np.asarray(X, dtype=np.float32).astype(np.float64)
+    codes = np.empty(X.shape, dtype=np.int16)
+    for f in range(X.shape[1]):
+        codes[:, f] = np.searchsorted(values[offsets[f]:offsets[f + 1]], X[:, f], side='left')
+    return codes
+
+
+if NUMBA_AVAILABLE:
+    @njit(nogil=True, cache=True)
+    def _leaf(X, i, node, feature, threshold, left, right):
+        while left[node] != -1:
+            if X[i, feature[node]] <= threshold[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return node
+
+    @njit(nogil=True, parallel=True, cache=True)
+    def _forest_predict_proba(X, feature, threshold, left, right, value, roots):
+        n_rows = X.shape[0]
+        n_trees = roots.shape[0]
+        n_classes = value.shape[1]
+
+        # One slice per tree so the parallel loop never writes shared memory
+        per_tree = np.zeros((n_trees, n_rows, n_classes))
+        for t in prange(n_trees):
+            for i in range(n_rows):
+                node = _leaf(X, i, roots[t], feature, threshold, left, right)
+                for c in range(n_classes):
+                    per_tree[t, i, c] = value[node, c]
+
+        return per_tree.sum(axis=0) / n_trees
+
+    @njit(nogil=True, cache=True)
+    def _forest_predict_proba_serial(X, feature, threshold, left, right, value, roots):
+        # Single-threaded variant for callers that parallelise over rows themselves
+        n_rows = X.shape[0]
+        n_trees = roots.shape[0]
+        n_classes = value.shape[1]
+
+        proba = np.zeros((n_rows, n_classes))
+        for i in range(n_rows):
+            for t in range(n_trees):
+                node = _leaf(X, i, roots[t], feature, threshold, left, right)
+                for c in range(n_classes):
+                    proba[i, c] += value[node, c]
+
+        return proba / n_trees
+
+
+def _numpy_predict_proba(X, feature, threshold, left, right, value, roots):
+    """Level-by-level traversal of every (row, tree) pair at once, for when Numba is missing"""
+    rows = np.arange(X.shape[0])[:, None]
+    nodes = np.broadcast_to(roots, (X.shape[0], roots.shape[0])).copy()
+    internal = left[nodes] != -1
+    while internal.any():
+        go_left = X[rows, feature[nodes]] <= threshold[nodes]
+        nodes = np.where(internal, np.where(go_left, left[nodes], right[nodes]), nodes)
+        internal = left[nodes] != -1
+    return value[nodes].mean(axis=1)
+
+
+if not NUMBA_AVAILABLE:
+    _forest_predict_proba = _forest_predict_proba_serial = _numpy_predict_proba
+
+
+class FlatForestModel:
+    """predict_proba adapter that scores a flattened forest with the Numba kernel
+
+    With ``n_threads`` unset the kernel parallelises over trees, which suits
+    small batches. With ``n_threads`` set, rows are split into that many chunks
+    and scored on a thread pool with the single-threaded kernel, which suits
+    many locations and few trees; the kernels release the GIL so the threads
+    run concurrently without oversubscribing cores.
+    """
+
+    def __init__(self, arrays: dict, n_threads: int = 0):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        # Present only for quantized forests
+        self.threshold_q = arrays.get('threshold_q')
+        self.quant_values = arrays.get('quant_values')
+        self.quant_offsets = arrays.get('quant_offsets')
+        self.n_threads = n_threads
+        self._executor = None
+
+    @classmethod
+    def from_sklearn(cls, model, quantize: bool = False, n_threads: int = 0) -> 'FlatForestModel':
+        arrays = flatten_forest(model)
+        if quantize:
+            arrays = quantize_forest(arrays, model.n_features_in_)
+        return cls(arrays, n_threads)
+
+    @classmethod
+    def load(cls, path: str, quantize: bool = False, n_threads: int = 0) -> 'FlatForestModel':
+        arrays = load_forest(path)
+        if quantize and 'threshold_q' not in arrays:
+            arrays = quantize_forest(arrays, int(arrays['n_features']))
+        return cls(arrays, n_threads)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.threshold_q is not None:
+            # Numba compiles a separate int16 specialization of the same kernel
+            X = _quantize(X, self.quant_values, self.quant_offsets)
+            threshold = self.threshold_q
+        else:
+            # sklearn compares float32 inputs against float64 thresholds; match it exactly
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            threshold = self.threshold
+
+        if self.n_threads > 1 and X.shape[0] > 1:
+            return self._predict_rows_parallel(X, threshold)
+
+        return _forest_predict_proba(
+            X, self.feature, threshold, self.left, self.right, self.value, self.roots
+        )
+
+    def _predict_rows_parallel(self, X: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_threads)
+
+        chunks = np.array_split(X, min(self.n_threads, X.shape[0]))
+        results = self._executor.map(
+            lambda chunk: _forest_predict_proba_serial(
+                chunk, self.feature, threshold, self.left, self.right, self.value, self.roots
+            ),
+            chunks
+        )
+        return np.concatenate(list(results))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-15 17:20
+
+import monitoring.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='predictionlog',
+            name='input_data',
+            field=monitoring.fields.ORJSONField(),
+        ),
+        migrations.AlterField(
+            model_name='predictionlog',
+            name='prediction_result',
+            field=monitoring.fields.ORJSONField(),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from monitoring.fields import ORJSONField
 from monitoring.models import CoastalLocation
 
 
@@ -23,8 +24,8 @@ class PredictionLog(models.Model):
     """Model for logging ML model predictions and performance"""
     model = models.ForeignKey(MLModel, on_delete=models.CASCADE)
     location = models.ForeignKey(CoastalLocation, on_delete=models.CASCADE)
-    input_data = models.JSONField()
-    prediction_result = models.JSONField()
+    input_data = ORJSONField()
+    prediction_result = ORJSONField()
     execution_time = models.FloatField()  # in seconds
     created_at = models.DateTimeField(auto_now_add=True)
     
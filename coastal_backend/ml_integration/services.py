@@ -1,21 +1,86 @@
+import hashlib
 import os
 import pickle
 import joblib
 import numpy as np
-import pandas as pd
 import time
 import logging
+from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Dict, List, Optional, Tuple
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 
-from django.db import models
-from monitoring.models import CoastalLocation, SensorData, RiskAssessment, Alert
+from django.db import connection, models, transaction
+from monitoring.models import CoastalLocation, SensorData, RiskAssessment, Alert, get_active_locations
 from .models import MLModel, PredictionLog
+from .fast_rf import NUMBA_AVAILABLE, FlatForestModel, is_flattenable
 
 logger = logging.getLogger(__name__)
 
+# Values used for measurements missing from the recent sensor data
+_SENSOR_DEFAULTS = MappingProxyType({
+    'water_level': 0.0,
+    'wave_height': 1.0,
+    'wind_speed': 5.0,
+    'wind_direction': 180.0,
+    'air_pressure': 1013.25,
+    'water_temperature': 15.0,
+    'salinity': 35.0
+})
+
+# Expected feature columns, in model input order (adjust these to match your model)
+_FEATURE_COLUMNS = (
+    'water_level', 'wave_height', 'wind_speed', 'wind_direction',
+    'air_pressure', 'water_temperature', 'hour_of_day', 'day_of_year'
+)
+
+# Temporal features are whole numbers; prepare_features stores them as ints
+_INT_FEATURE_COLUMNS = ('hour_of_day', 'day_of_year')
+
+
+# An assessment within this score distance at the same risk level is treated as
+# unchanged and reused, as long as it is recent enough to still show up in the
+# last-24-hours dashboard and assessment views
+_RISK_SCORE_EPSILON = 0.01
+_ASSESSMENT_REUSE_WINDOW = timedelta(hours=12)
+
+
+# Upper bounds of the low, medium and high risk levels; scores at or above the
+# last bound are critical (see MLPredictionService._classify_risk)
+_RISK_THRESHOLDS = np.array([0.3, 0.6, 0.8])
+_RISK_LABELS = ('low', 'medium', 'high', 'critical')
+
+
+@dataclass(slots=True)
+class PredictionResult:
+    """Outcome of one risk prediction; use dataclasses.asdict for JSON payloads"""
+    risk_score: float
+    risk_level: str
+    confidence: float
+    assessment_id: int
+
+
+def _day_of_year(moment: datetime) -> int:
+    """Day of the year for a datetime, without building a full timetuple"""
+    return moment.toordinal() - date(moment.year, 1, 1).toordinal() + 1
+
+
+class OnnxRiskModel:
+    """predict_proba adapter over an onnxruntime session for ONNX-exported models"""
+    
+    def __init__(self, model_path: str):
+        import onnxruntime
+        
+        self._session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self._input_name = self._session.get_inputs()[0].name
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        # Outputs are (label, probabilities); the model is exported with zipmap disabled
+        return self._session.run(None, {self._input_name: X.astype(np.float32)})[1]
+
 
 class MLPredictionService:
     """Service for integrating ML model predictions with coastal data"""
@@ -24,7 +89,18 @@ class MLPredictionService:
         self.model = None
         self.model_version = None
         self.feature_columns = None
+        self._ml_model_record = None
+        self._ml_model_pk = None
+        self._defaults_vec = None
+        self._feature_index = None
         self._load_model()
+        
+        # Per-column defaults and positions for the batched feature builder
+        if self.feature_columns:
+            self._defaults_vec = np.array(
+                [_SENSOR_DEFAULTS.get(col, 0.0) for col in self.feature_columns], dtype=np.float64
+            )
+            self._feature_index = {col: i for i, col in enumerate(self.feature_columns)}
     
     def _load_model(self):
         """Load the ML model from file"""
@@ -32,6 +108,10 @@ class MLPredictionService:
             # Try to get the active model from database
             ml_model_record = MLModel.objects.filter(is_active=True).first()
             
+            # Keep the record around so prediction logs don't re-query it
+            self._ml_model_record = ml_model_record
+            self._ml_model_pk = ml_model_record.pk if ml_model_record else None
+            
             if ml_model_record:
                 model_path = ml_model_record.model_file_path
                 self.model_version = f"{ml_model_record.name}_v{ml_model_record.version}"
@@ -41,20 +121,28 @@ class MLPredictionService:
                 self.model_version = "default_v1.0"
             
             if os.path.exists(model_path):
-                # Try loading with joblib first, then pickle
-                try:
-                    self.model = joblib.load(model_path)
-                except:
-                    with open(model_path, 'rb') as f:
-                        self.model = pickle.load(f)
+                if model_path.endswith('.onnx'):
+                    self.model = self._load_onnx_model(model_path)
+                elif model_path.endswith('.npz'):
+                    # Flat tree arrays: no sklearn import and no unpickling
+                    self.model = FlatForestModel.load(
+                        model_path,
+                        quantize=settings.ML_QUANTIZED_TREES,
+                        n_threads=settings.ML_N_THREADS
+                    )
+                else:
+                    self.model = self._load_pickled_model(model_path)
+                    if NUMBA_AVAILABLE and is_flattenable(self.model):
+                        # Score through the compiled flat-forest kernel instead of sklearn
+                        self.model = FlatForestModel.from_sklearn(
+                            self.model,
+                            quantize=settings.ML_QUANTIZED_TREES,
+                            n_threads=settings.ML_N_THREADS
+                        )
                 
                 logger.info(f"ML model loaded successfully: {self.model_version}")
                 
-                # Define expected feature columns (you may need to adjust this based on your model)
-                self.feature_columns = [
-                    'water_level', 'wave_height', 'wind_speed', 'wind_direction',
-                    'air_pressure', 'water_temperature', 'hour_of_day', 'day_of_year'
-                ]
+                self.feature_columns = _FEATURE_COLUMNS
             else:
                 logger.warning(f"ML model not found at {model_path}. Using dummy predictions.")
                 self.model = None
@@ -63,69 +151,156 @@ class MLPredictionService:
             logger.error(f"Failed to load ML model: {str(e)}")
             self.model = None
     
-    def prepare_features(self, location: CoastalLocation, hours_back: int = 6) -> Optional[pd.DataFrame]:
-        """Prepare feature data from sensor readings for ML model input"""
+    @staticmethod
+    def _load_pickled_model(model_path: str):
+        """Load a pickled sklearn estimator"""
+        # Try plain pickle first; joblib dumps either fail to unpickle or
+        # come back as a bare numpy array, so fall back to joblib for those
+        try:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+            if hasattr(model, 'predict_proba'):
+                return model
+        except Exception:
+            pass
+        
+        # Memory-map the tree arrays instead of copying them onto the heap
+        return joblib.load(model_path, mmap_mode='r')
+    
+    def _load_onnx_model(self, model_path: str):
+        """Load an ONNX model, falling back to the sibling .pkl if onnxruntime is missing"""
+        try:
+            return OnnxRiskModel(model_path)
+        except ImportError:
+            fallback_path = os.path.splitext(model_path)[0] + '.pkl'
+            logger.warning(f"onnxruntime not installed, falling back to {fallback_path}")
+            return self._load_pickled_model(fallback_path)
+    
+    @staticmethod
+    def _latest_sensor_values(location_ids: List[int], since) -> Dict[int, Dict[str, float]]:
+        """Latest value per location and measurement type since a cutoff, from a single query"""
+        readings = SensorData.objects.filter(
+            location_id__in=location_ids,
+            timestamp__gte=since
+        ).order_by('location_id', 'measurement_type', '-timestamp').values_list(
+            'location_id', 'measurement_type', 'value'
+        )
+        
+        if connection.vendor == 'postgresql':
+            # DISTINCT ON returns just the newest row per location and measurement type
+            readings = readings.distinct('location_id', 'measurement_type')
+        
+        latest = {}
+        for location_id, measurement_type, value in readings:
+            latest.setdefault(location_id, {}).setdefault(measurement_type, value)
+        return latest
+    
+    @staticmethod
+    def _latest_assessments(location_ids: List[int], since) -> Dict[int, RiskAssessment]:
+        """Newest risk assessment per location since a cutoff, from a single query"""
+        assessments = RiskAssessment.objects.filter(
+            location_id__in=location_ids,
+            created_at__gte=since
+        ).order_by('location_id', '-created_at').only('location', 'risk_level', 'risk_score')
+        
+        if connection.vendor == 'postgresql':
+            assessments = assessments.distinct('location_id')
+        
+        latest = {}
+        for assessment in assessments:
+            latest.setdefault(assessment.location_id, assessment)
+        return latest
+    
+    @staticmethod
+    def _is_unchanged(last: Optional[RiskAssessment], risk_level: str, risk_score: float) -> bool:
+        """Whether a new assessment would repeat the previous one"""
+        return (
+            last is not None
+            and last.risk_level == risk_level
+            and abs(last.risk_score - risk_score) < _RISK_SCORE_EPSILON
+        )
+    
+    def prepare_features(self, location: CoastalLocation, hours_back: int = 6,
+                         latest_values: Optional[Dict[str, float]] = None,
+                         now: Optional[datetime] = None) -> Optional[Tuple[np.ndarray, Dict]]:
+        """Prepare feature data from sensor readings for ML model input
+        
+        Returns the (1, n_features) model input row together with the feature
+        dict it was built from, which is what gets logged with the prediction.
+        Batch callers can pass ``latest_values`` (measurement type -> value) to
+        skip the per-location sensor data query, and a shared ``now`` so the
+        temporal features are computed once per batch.
+        """
         try:
-            # Get recent sensor data
-            since = timezone.now() - timedelta(hours=hours_back)
-            sensor_data = location.sensor_data.filter(timestamp__gte=since)
+            if now is None:
+                now = timezone.now()
+            
+            if latest_values is None:
+                # Get recent sensor data
+                since = now - timedelta(hours=hours_back)
+                latest_values = self._latest_sensor_values([location.id], since).get(location.id, {})
             
-            if not sensor_data.exists():
+            if not latest_values:
                 logger.warning(f"No sensor data available for {location.name}")
                 return None
             
             # Create a feature dictionary
             features = {}
             
-            # Get latest values for each measurement type
-            for measurement_type, _ in SensorData.MEASUREMENT_TYPES:
-                latest = sensor_data.filter(measurement_type=measurement_type).first()
-                if latest:
-                    features[measurement_type] = latest.value
+            # Get latest values for each model input
+            for col in self.feature_columns:
+                if col in latest_values:
+                    features[col] = latest_values[col]
                 else:
                     # Use default values for missing measurements
-                    defaults = {
-                        'water_level': 0.0,
-                        'wave_height': 1.0,
-                        'wind_speed': 5.0,
-                        'wind_direction': 180.0,
-                        'air_pressure': 1013.25,
-                        'water_temperature': 15.0,
-                        'salinity': 35.0
-                    }
-                    features[measurement_type] = defaults.get(measurement_type, 0.0)
+                    features[col] = _SENSOR_DEFAULTS.get(col, 0.0)
             
             # Add temporal features
-            now = timezone.now()
             features['hour_of_day'] = now.hour
-            features['day_of_year'] = now.timetuple().tm_yday
-            
-            # Create DataFrame with the expected columns
-            df = pd.DataFrame([features])
-            
-            # Ensure all required columns are present
-            for col in self.feature_columns:
-                if col not in df.columns:
-                    df[col] = 0.0
+            features['day_of_year'] = _day_of_year(now)
             
-            # Select only the required columns in the correct order
-            df = df[self.feature_columns]
+            # Fill a single float64 row in the column order the model expects
+            arr = np.empty((1, len(self.feature_columns)), dtype=np.float64)
+            for i, col in enumerate(self.feature_columns):
+                arr[0, i] = features[col]
             
-            return df
+            return arr, features
             
         except Exception as e:
             logger.error(f"Error preparing features for {location.name}: {str(e)}")
             return None
     
-    def predict_risk(self, location: CoastalLocation) -> Optional[Dict]:
+    def _build_feature_matrix(self, latest_rows: List[Dict[str, float]], now) -> np.ndarray:
+        """Build an (n_locations, n_features) matrix, defaulting cells with no recent reading"""
+        X = np.broadcast_to(self._defaults_vec, (len(latest_rows), len(self.feature_columns))).copy()
+        
+        # Scatter the observed values over the defaults in one vectorized assignment
+        rows, cols, values = [], [], []
+        for row, latest_values in enumerate(latest_rows):
+            for measurement_type, value in latest_values.items():
+                col = self._feature_index.get(measurement_type)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    values.append(value)
+        X[rows, cols] = values
+        
+        # Temporal features come from one timestamp shared by the whole batch
+        X[:, self._feature_index['hour_of_day']] = now.hour
+        X[:, self._feature_index['day_of_year']] = _day_of_year(now)
+        
+        return X
+    
+    def predict_risk(self, location: CoastalLocation) -> Optional[PredictionResult]:
         """Generate risk prediction for a coastal location"""
         start_time = time.time()
         
         try:
             # Prepare feature data
-            features = self.prepare_features(location)
-            if features is None:
+            prepared = self.prepare_features(location)
+            if prepared is None:
                 return None
+            features, input_features = prepared
             
             if self.model is None:
                 # Use dummy prediction if model is not available
@@ -135,41 +310,35 @@ class MLPredictionService:
             else:
                 # Make prediction using the loaded model
                 prediction = self.model.predict_proba(features)[0]
-                risk_score = float(prediction[1]) if len(prediction) > 1 else float(prediction[0])
-                confidence = max(prediction)  # Use max probability as confidence
-            
-            # Determine risk level based on score
-            if risk_score < 0.3:
-                risk_level = 'low'
-            elif risk_score < 0.6:
-                risk_level = 'medium'
-            elif risk_score < 0.8:
-                risk_level = 'high'
-            else:
-                risk_level = 'critical'
+                risk_score, confidence = self._score_prediction(prediction)
             
-            # Prepare prediction data
-            prediction_data = {
-                'input_features': features.to_dict('records')[0],
-                'model_output': risk_score,
-                'processing_timestamp': timezone.now().isoformat()
-            }
+            risk_level = self._classify_risk(risk_score)
             
-            # Save risk assessment
-            risk_assessment = RiskAssessment.objects.create(
-                location=location,
-                risk_score=risk_score,
-                risk_level=risk_level,
-                prediction_data=prediction_data,
-                model_version=self.model_version,
-                confidence=confidence
-            )
+            # Save risk assessment, reusing the previous one when nothing changed
+            last = self._latest_assessments(
+                [location.id], timezone.now() - _ASSESSMENT_REUSE_WINDOW
+            ).get(location.id)
+            if self._is_unchanged(last, risk_level, risk_score):
+                risk_assessment = last
+            else:
+                risk_assessment = RiskAssessment.objects.create(
+                    location=location,
+                    risk_score=risk_score,
+                    risk_level=risk_level,
+                    prediction_data={
+                        'input_features': input_features,
+                        'model_output': risk_score,
+                        'processing_timestamp': timezone.now().isoformat()
+                    },
+                    model_version=self.model_version,
+                    confidence=confidence
+                )
             
             # Log the prediction
             PredictionLog.objects.create(
-                model=MLModel.objects.filter(is_active=True).first(),
+                model_id=self._ml_model_pk,
                 location=location,
-                input_data=prediction_data['input_features'],
+                input_data=input_features,
                 prediction_result={
                     'risk_score': risk_score,
                     'risk_level': risk_level,
@@ -182,17 +351,32 @@ class MLPredictionService:
             if risk_score >= settings.ALERT_THRESHOLD:
                 self._trigger_alert(location, risk_assessment)
             
-            return {
-                'risk_score': risk_score,
-                'risk_level': risk_level,
-                'confidence': confidence,
-                'assessment_id': risk_assessment.id
-            }
+            return PredictionResult(risk_score, risk_level, confidence, risk_assessment.id)
             
         except Exception as e:
             logger.error(f"Error predicting risk for {location.name}: {str(e)}")
             return None
     
+    def predict_risk_cached(self, location: CoastalLocation) -> Optional[PredictionResult]:
+        """predict_risk, reused until the location gets a newer sensor reading
+        
+        Results are cached per model version and latest reading timestamp for
+        PREDICTION_CACHE_TIMEOUT seconds, so repeated requests within an ingest
+        interval skip feature building, inference and the assessment writes.
+        """
+        latest = location.sensor_data.aggregate(latest=models.Max('timestamp'))['latest']
+        # model_version comes from MLModel.name and may contain spaces, which
+        # memcached-safe cache keys must not
+        version = hashlib.md5(self.model_version.encode()).hexdigest()
+        key = f"prediction:{version}:{location.pk}:{latest.timestamp() if latest else 0}"
+        
+        prediction = cache.get(key)
+        if prediction is None:
+            prediction = self.predict_risk(location)
+            if prediction is not None:
+                cache.set(key, prediction, settings.PREDICTION_CACHE_TIMEOUT)
+        return prediction
+    
     def _trigger_alert(self, location: CoastalLocation, risk_assessment: RiskAssessment):
         """Trigger an alert based on risk assessment"""
         try:
@@ -226,13 +410,13 @@ class MLPredictionService:
             )
             
             # Check if there's already an active alert for this location
-            existing_alert = Alert.objects.filter(
+            alert_exists = Alert.objects.filter(
                 location=location,
                 status='active',
                 alert_type=alert_type
-            ).first()
+            ).exists()
             
-            if not existing_alert:
+            if not alert_exists:
                 Alert.objects.create(
                     location=location,
                     risk_assessment=risk_assessment,
@@ -248,15 +432,142 @@ class MLPredictionService:
         except Exception as e:
             logger.error(f"Error triggering alert for {location.name}: {str(e)}")
     
-    def predict_all_locations(self):
-        """Run risk predictions for all active locations"""
-        locations = CoastalLocation.objects.filter(is_active=True)
+    @staticmethod
+    def _score_prediction(prediction) -> Tuple[float, float]:
+        """Extract (risk_score, confidence) from one row of predict_proba output"""
+        risk_score = float(prediction[1]) if len(prediction) > 1 else float(prediction[0])
+        confidence = float(max(prediction))  # Use max probability as confidence
+        return risk_score, confidence
+    
+    @staticmethod
+    def _classify_risk(risk_score: float) -> str:
+        """Determine risk level based on score"""
+        if risk_score < 0.3:
+            return 'low'
+        elif risk_score < 0.6:
+            return 'medium'
+        elif risk_score < 0.8:
+            return 'high'
+        return 'critical'
+    
+    def predict_all_locations(self) -> Dict[str, PredictionResult]:
+        """Run risk predictions for all active locations, keyed by station id"""
+        locations = get_active_locations()
         results = {}
         
+        # Prefetch the latest sensor values for every location at once
+        now = timezone.now()
+        latest_by_location = self._latest_sensor_values(
+            [location.id for location in locations], now - timedelta(hours=6)
+        )
+        
+        # Only locations with recent data get a feature row
+        batch_locations = []
         for location in locations:
-            prediction = self.predict_risk(location)
-            if prediction:
-                results[location.station_id] = prediction
+            if location.id in latest_by_location:
+                batch_locations.append(location)
+            else:
+                logger.warning(f"No sensor data available for {location.name}")
+        
+        if not batch_locations:
+            return results
+        
+        start_time = time.time()
+        
+        try:
+            batch = self._build_feature_matrix(
+                [latest_by_location[location.id] for location in batch_locations], now
+            )
+            
+            # Bind what the per-location loops below call to locals
+            score_prediction = self._score_prediction
+            is_unchanged = self._is_unchanged
+            feature_columns = self.feature_columns
+            alert_threshold = settings.ALERT_THRESHOLD
+            
+            # Score the whole batch in a single predict_proba call
+            if self.model is None:
+                logger.warning("Using dummy predictions for all locations")
+                scores = [(np.random.uniform(0.1, 0.9), 0.5) for _ in batch_locations]
+            else:
+                scores = [score_prediction(row) for row in self.model.predict_proba(batch)]
+            
+            input_features = [dict(zip(feature_columns, row)) for row in batch.tolist()]
+            # The float64 matrix turned the temporal columns into floats; store
+            # them as ints, the same as the single-location path
+            int_columns = [col for col in _INT_FEATURE_COLUMNS if col in feature_columns]
+            for features in input_features:
+                for col in int_columns:
+                    features[col] = int(features[col])
+            
+            # Bucket every score into its risk level in one vectorised pass
+            risk_levels = [
+                _RISK_LABELS[i] for i in
+                np.searchsorted(_RISK_THRESHOLDS, [score for score, _ in scores], side='right')
+            ]
+            processing_timestamp = timezone.now().isoformat()
+            
+            last_by_location = self._latest_assessments(
+                [location.id for location in batch_locations], now - _ASSESSMENT_REUSE_WINDOW
+            )
+            
+            # (location, assessment, input features, score, level, confidence) per prediction;
+            # unchanged locations point at their previous assessment instead of a new row
+            predictions = []
+            new_assessments = []
+            for location, features, (risk_score, confidence), risk_level in zip(
+                batch_locations, input_features, scores, risk_levels
+            ):
+                assessment = last_by_location.get(location.id)
+                if not is_unchanged(assessment, risk_level, risk_score):
+                    assessment = RiskAssessment(
+                        location=location,
+                        risk_score=risk_score,
+                        risk_level=risk_level,
+                        prediction_data={
+                            'input_features': features,
+                            'model_output': risk_score,
+                            'processing_timestamp': processing_timestamp
+                        },
+                        model_version=self.model_version,
+                        confidence=confidence
+                    )
+                    new_assessments.append(assessment)
+                predictions.append((location, assessment, features, risk_score, risk_level, confidence))
+            
+            # Spread the batch inference time evenly over the logged predictions
+            execution_time = (time.time() - start_time) / len(predictions)
+            
+            # Two INSERTs for the whole batch; prediction logs need a registered MLModel
+            with transaction.atomic():
+                if new_assessments:
+                    RiskAssessment.objects.bulk_create(new_assessments)
+                if self._ml_model_pk is not None:
+                    PredictionLog.objects.bulk_create([
+                        PredictionLog(
+                            model_id=self._ml_model_pk,
+                            location=location,
+                            input_data=features,
+                            prediction_result={
+                                'risk_score': risk_score,
+                                'risk_level': risk_level,
+                                'confidence': confidence
+                            },
+                            execution_time=execution_time
+                        )
+                        for location, _, features, risk_score, risk_level, confidence in predictions
+                    ])
+            
+            for location, assessment, _, risk_score, risk_level, confidence in predictions:
+                if risk_score >= alert_threshold:
+                    self._trigger_alert(location, assessment)
+                
+                results[location.station_id] = PredictionResult(
+                    risk_score, risk_level, confidence, assessment.id
+                )
+        
+        except Exception as e:
+            logger.error(f"Error running batch risk predictions: {str(e)}")
         
         return results
     
@@ -276,38 +587,40 @@ class ModelPerformanceService:
     @staticmethod
     def get_prediction_statistics(days_back: int = 7) -> Dict:
         """Get prediction statistics for the last N days"""
-        since = timezone.now() - timedelta(days=days_back)
+        now = timezone.now()
+        since = now - timedelta(days=days_back)
         
         predictions = PredictionLog.objects.filter(created_at__gte=since)
         
-        if not predictions.exists():
+        # Totals and per-day counts come from a single aggregate query
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_starts = [today - timedelta(days=i) for i in range(days_back)]
+        stats = predictions.aggregate(
+            total=models.Count('id'),
+            avg_time=models.Avg('execution_time'),
+            **{
+                f'day_{i}': models.Count('id', filter=models.Q(
+                    created_at__gte=day_start,
+                    created_at__lt=day_start + timedelta(days=1)
+                ))
+                for i, day_start in enumerate(day_starts)
+            }
+        )
+        
+        if not stats['total']:
             return {
                 'total_predictions': 0,
                 'average_execution_time': 0,
                 'predictions_by_day': []
             }
         
-        total_predictions = predictions.count()
-        avg_execution_time = predictions.aggregate(
-            avg_time=models.Avg('execution_time')
-        )['avg_time'] or 0
+        total_predictions = stats['total']
+        avg_execution_time = stats['avg_time'] or 0
         
-        # Group by day
-        predictions_by_day = []
-        for i in range(days_back):
-            day = timezone.now() - timedelta(days=i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            day_predictions = predictions.filter(
-                created_at__gte=day_start,
-                created_at__lt=day_end
-            ).count()
-            
-            predictions_by_day.append({
-                'date': day_start.date().isoformat(),
-                'count': day_predictions
-            })
+        predictions_by_day = [
+            {'date': day_start.date().isoformat(), 'count': stats[f'day_{i}']}
+            for i, day_start in enumerate(day_starts)
+        ]
         
         return {
             'total_predictions': total_predictions,
@@ -322,26 +635,33 @@ class ModelPerformanceService:
         
         alerts = Alert.objects.filter(created_at__gte=since)
         
-        if not alerts.exists():
+        # Total, per-severity and per-type counts in a single aggregate query
+        counts = alerts.aggregate(
+            total=models.Count('id'),
+            **{
+                f'severity_{severity}': models.Count('id', filter=models.Q(severity=severity))
+                for severity, _ in Alert.SEVERITY_LEVELS
+            },
+            **{
+                f'type_{alert_type}': models.Count('id', filter=models.Q(alert_type=alert_type))
+                for alert_type, _ in Alert.ALERT_TYPES
+            }
+        )
+        
+        if not counts['total']:
             return {
                 'total_alerts': 0,
                 'alerts_by_severity': {},
                 'alerts_by_type': {}
             }
         
-        total_alerts = alerts.count()
-        
-        # Group by severity
-        alerts_by_severity = {}
-        for severity, _ in Alert.SEVERITY_LEVELS:
-            count = alerts.filter(severity=severity).count()
-            alerts_by_severity[severity] = count
-        
-        # Group by type
-        alerts_by_type = {}
-        for alert_type, _ in Alert.ALERT_TYPES:
-            count = alerts.filter(alert_type=alert_type).count()
-            alerts_by_type[alert_type] = count
+        total_alerts = counts['total']
+        alerts_by_severity = {
+            severity: counts[f'severity_{severity}'] for severity, _ in Alert.SEVERITY_LEVELS
+        }
+        alerts_by_type = {
+            alert_type: counts[f'type_{alert_type}'] for alert_type, _ in Alert.ALERT_TYPES
+        }
         
         return {
             'total_alerts': total_alerts,
@@ -1,3 +1,63 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.ensemble import RandomForestClassifier
+
+from .fast_rf import FlatForestModel, load_forest, save_forest
+
+
+class FlatForestModelTests(SimpleTestCase):
+    """The flattened forest must score exactly like the sklearn forest it came from"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(400, 4)) * [1.0, 10.0, 100.0, 1.0]
+        # Feature 3 only ever separates the classes at 5.0, so every tree
+        # that uses it splits on that single threshold
+        X[:, 3] = rng.choice([4.0, 6.0], size=400)
+        y = ((X[:, 0] + X[:, 1] / 10 > 0) | (X[:, 3] > 5.0)).astype(int)
+        cls.rf = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+        cls.X = rng.normal(size=(500, 4)) * [1.0, 10.0, 100.0, 1.0]
+        cls.X[:, 3] = rng.uniform(3.0, 7.0, size=500)
+
+    def test_matches_sklearn(self):
+        model = FlatForestModel.from_sklearn(self.rf)
+        np.testing.assert_allclose(model.predict_proba(self.X), self.rf.predict_proba(self.X))
+
+    def test_row_parallel_matches_sklearn(self):
+        model = FlatForestModel.from_sklearn(self.rf, n_threads=3)
+        np.testing.assert_allclose(model.predict_proba(self.X), self.rf.predict_proba(self.X))
+
+    def test_quantized_routes_like_sklearn(self):
+        model = FlatForestModel.from_sklearn(self.rf, quantize=True)
+        np.testing.assert_allclose(model.predict_proba(self.X), self.rf.predict_proba(self.X))
+
+    def test_quantized_single_split_feature_just_above_threshold(self):
+        thresholds = np.unique(np.concatenate([
+            estimator.tree_.threshold[estimator.tree_.feature == 3] for estimator in self.rf.estimators_
+        ]))
+        self.assertEqual(len(thresholds), 1)
+        split = float(thresholds[0])
+
+        # Inputs on, just below and just above the one split, where a coarse
+        # quantization step would put them in the same code as the threshold
+        probes = np.zeros((5, 4))
+        probes[:, 3] = [split, np.nextafter(np.float32(split), np.float32(-np.inf)),
+                        np.nextafter(np.float32(split), np.float32(np.inf)), split + 0.01, split + 0.6]
+        model = FlatForestModel.from_sklearn(self.rf, quantize=True)
+        np.testing.assert_allclose(model.predict_proba(probes), self.rf.predict_proba(probes))
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'forest.npz')
+            save_forest(path, self.rf)
+            arrays = load_forest(path)
+            self.assertEqual(int(arrays['n_features']), self.rf.n_features_in_)
+
+            expected = self.rf.predict_proba(self.X)
+            np.testing.assert_allclose(FlatForestModel.load(path).predict_proba(self.X), expected)
+            np.testing.assert_allclose(FlatForestModel.load(path, quantize=True).predict_proba(self.X), expected)
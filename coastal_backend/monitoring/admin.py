@@ -23,6 +23,7 @@ class SensorDataAdmin(admin.ModelAdmin):
 class RiskAssessmentAdmin(admin.ModelAdmin):
     list_display = ['location', 'risk_level', 'risk_score', 'confidence', 'model_version', 'created_at']
     list_filter = ['risk_level', 'model_version', 'created_at']
+    list_select_related = ['location']
     search_fields = ['location__name']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
@@ -32,6 +33,7 @@ class RiskAssessmentAdmin(admin.ModelAdmin):
 class AlertAdmin(admin.ModelAdmin):
     list_display = ['title', 'location', 'alert_type', 'severity', 'status', 'created_at']
     list_filter = ['alert_type', 'severity', 'status', 'created_at']
+    list_select_related = ['location']
     search_fields = ['title', 'message', 'location__name']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
@@ -0,0 +1,47 @@
+import json
+
+from django.db import models
+from django.db.models.expressions import Value
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _orjson_dumps(value) -> str:
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+class ORJSONField(models.JSONField):
+    """JSONField that encodes and decodes with orjson when it is installed
+
+    Prediction payloads are flat dicts of numbers, so orjson's native float and
+    numpy handling makes encoding them several times cheaper than the stdlib
+    json module. Without orjson, or with a custom encoder/decoder, this behaves
+    exactly like models.JSONField. The column type is unchanged.
+    """
+
+    def _use_orjson(self) -> bool:
+        return ORJSON_AVAILABLE and self.encoder is None and self.decoder is None
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        # Expressions such as Value(..., JSONField()) keep JSONField's own handling
+        if not self._use_orjson() or isinstance(value, Value) or hasattr(value, 'as_sql'):
+            return super().get_db_prep_value(value, connection, prepared)
+        if not prepared:
+            value = self.get_prep_value(value)
+        if connection.vendor == 'postgresql':
+            # Jsonb for whichever of psycopg 3 or psycopg2 is installed
+            from django.db.backends.postgresql.psycopg_any import Jsonb
+            return Jsonb(value, dumps=_orjson_dumps)
+        return _orjson_dumps(value)
+
+    def from_db_value(self, value, expression, connection):
+        if not self._use_orjson() or not isinstance(value, (str, bytes)):
+            return super().from_db_value(value, expression, connection)
+        try:
+            return orjson.loads(value)
+        except json.JSONDecodeError:
+            return value
@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
+from django.db import connection
 from django.utils import timezone
 from datetime import timedelta
-import random
+import numpy as np
 
-from monitoring.models import CoastalLocation, SensorData
+from monitoring.models import CoastalLocation, invalidate_active_locations
+from monitoring.services import SensorDataCopyWriter
 from ml_integration.models import MLModel
 
 
@@ -16,6 +18,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Only create coastal locations without sensor data',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of sensor readings per executemany batch (ignored with COPY)',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write('Seeding coastal monitoring data...')
@@ -59,19 +67,20 @@ class Command(BaseCommand):
             }
         ]
 
-        created_locations = []
-        for location_data in locations_data:
-            location, created = CoastalLocation.objects.get_or_create(
-                station_id=location_data['station_id'],
-                defaults=location_data
-            )
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f'Created location: {location.name}')
-                )
-            else:
-                self.stdout.write(f'Location already exists: {location.name}')
-            created_locations.append(location)
+        # Insert any missing locations in one statement (existing station ids
+        # are skipped by their unique constraint), then load them all back
+        CoastalLocation.objects.bulk_create(
+            [CoastalLocation(**location_data) for location_data in locations_data],
+            ignore_conflicts=True
+        )
+        # bulk_create sends no post_save signals
+        invalidate_active_locations()
+        created_locations = list(CoastalLocation.objects.filter(
+            station_id__in=[location_data['station_id'] for location_data in locations_data]
+        ))
+        self.stdout.write(
+            self.style.SUCCESS(f'Seeded {len(created_locations)} locations')
+        )
 
         # Create ML Model record
         ml_model, created = MLModel.objects.get_or_create(
@@ -92,45 +101,49 @@ class Command(BaseCommand):
             # Create sample sensor data for the last 24 hours
             self.stdout.write('Creating sample sensor data...')
             
+            # (measurement type, unit, low, high) of the realistic sample ranges
             measurement_types = [
-                ('water_level', 'meters'),
-                ('wave_height', 'meters'),
-                ('wind_speed', 'm/s'),
-                ('wind_direction', 'degrees'),
-                ('air_pressure', 'mb'),
-                ('water_temperature', 'celsius')
+                ('water_level', 'meters', 0.5, 3.0),
+                ('wave_height', 'meters', 0.5, 4.0),
+                ('wind_speed', 'm/s', 2.0, 15.0),
+                ('wind_direction', 'degrees', 0, 360),
+                ('air_pressure', 'mb', 1005, 1025),
+                ('water_temperature', 'celsius', 18.0, 28.0)
             ]
 
-            for location in created_locations:
-                # Create data for the last 24 hours (every hour)
-                for hours_ago in range(24):
-                    timestamp = timezone.now() - timedelta(hours=hours_ago)
-                    
-                    for measurement_type, unit in measurement_types:
-                        # Generate realistic sample data
-                        if measurement_type == 'water_level':
-                            value = random.uniform(0.5, 3.0)
-                        elif measurement_type == 'wave_height':
-                            value = random.uniform(0.5, 4.0)
-                        elif measurement_type == 'wind_speed':
-                            value = random.uniform(2.0, 15.0)
-                        elif measurement_type == 'wind_direction':
-                            value = random.uniform(0, 360)
-                        elif measurement_type == 'air_pressure':
-                            value = random.uniform(1005, 1025)
-                        elif measurement_type == 'water_temperature':
-                            value = random.uniform(18.0, 28.0)
-                        else:
-                            value = random.uniform(0, 100)
+            # Create data for the last 24 hours (every hour), drawing every
+            # location's values for a measurement type in one call
+            now = timezone.now()
+            timestamps = [now - timedelta(hours=hours_ago) for hours_ago in range(24)]
+            samples = {
+                measurement_type: np.random.uniform(
+                    low, high, size=(len(created_locations), len(timestamps))
+                ).tolist()
+                for measurement_type, _, low, high in measurement_types
+            }
+
+            # Raw rows in SensorDataCopyWriter.FIELDS order skip building model
+            # instances; datetimes are adapted for the backend once up front
+            adapt_datetime = connection.ops.adapt_datetimefield_value
+            db_timestamps = [adapt_datetime(timestamp) for timestamp in timestamps]
+            created_at = adapt_datetime(now)
+            rows = [
+                (
+                    location.id,
+                    measurement_type,
+                    samples[measurement_type][location_index][hours_ago],
+                    unit,
+                    db_timestamp,
+                    'sample_data',
+                    'good',
+                    created_at
+                )
+                for location_index, location in enumerate(created_locations)
+                for hours_ago, db_timestamp in enumerate(db_timestamps)
+                for measurement_type, unit, _, _ in measurement_types
+            ]
 
-                        SensorData.objects.create(
-                            location=location,
-                            measurement_type=measurement_type,
-                            value=value,
-                            unit=unit,
-                            timestamp=timestamp,
-                            data_source='sample_data'
-                        )
+            SensorDataCopyWriter(batch_size=options['batch_size']).write_rows(rows)
 
             self.stdout.write(
                 self.style.SUCCESS('Created sample sensor data for all locations')
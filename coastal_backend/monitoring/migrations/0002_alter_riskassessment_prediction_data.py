@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-15 17:20
+
+import monitoring.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='riskassessment',
+            name='prediction_data',
+            field=monitoring.fields.ORJSONField(),
+        ),
+    ]
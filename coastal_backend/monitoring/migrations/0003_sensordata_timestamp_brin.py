@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+# BRIN indexes are PostgreSQL-only, so they cannot be declared in
+# SensorData.Meta.indexes without breaking SQLite development databases
+BRIN_INDEX_NAME = 'monitoring_sensordata_ts_brin'
+
+
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {BRIN_INDEX_NAME} '
+        f'ON monitoring_sensordata USING brin ("timestamp")'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {BRIN_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0002_alter_riskassessment_prediction_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
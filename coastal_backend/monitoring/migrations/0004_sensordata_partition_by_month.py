@@ -0,0 +1,97 @@
+from django.db import migrations
+from django.utils import timezone
+
+from monitoring.partitioning import (
+    SENSOR_DATA_TABLE, add_months, create_default_partition, create_month_partitions, month_start
+)
+
+
+# Declarative partitioning is PostgreSQL-only, so the table is rebuilt here
+# rather than through the model; see monitoring/partitioning.py
+MONTHS_AHEAD = 3
+
+
+def _table_definition(cursor, table):
+    """Primary key name, foreign key and index definitions of a table"""
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+        [table]
+    )
+    primary_key = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table]
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(
+        "SELECT index_class.relname, pg_get_indexdef(pg_index.indexrelid) FROM pg_index "
+        "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+        "WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisprimary",
+        [table]
+    )
+    indexes = cursor.fetchall()
+    return primary_key, foreign_keys, indexes
+
+
+def _rebuild_sensor_data(schema_editor, partitioned):
+    """Copy SensorData into a new partitioned (or plain) table with the same indexes"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    old_table = f'{SENSOR_DATA_TABLE}_old'
+    sequence = f'{SENSOR_DATA_TABLE}_id_seq_new'
+    connection = schema_editor.connection
+
+    with connection.cursor() as cursor:
+        # Index definitions are read before the rename, so they name the new table
+        primary_key, foreign_keys, indexes = _table_definition(cursor, SENSOR_DATA_TABLE)
+
+        cursor.execute(f'ALTER TABLE {SENSOR_DATA_TABLE} RENAME TO {old_table}')
+        cursor.execute(f'ALTER TABLE {old_table} RENAME CONSTRAINT {primary_key} TO {old_table}_pkey')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+
+        partition_clause = ' PARTITION BY RANGE ("timestamp")' if partitioned else ''
+        cursor.execute(f'CREATE TABLE {SENSOR_DATA_TABLE} (LIKE {old_table}){partition_clause}')
+        cursor.execute(f'CREATE SEQUENCE {sequence} OWNED BY {SENSOR_DATA_TABLE}.id')
+        cursor.execute(f"ALTER TABLE {SENSOR_DATA_TABLE} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        primary_key_columns = 'id, "timestamp"' if partitioned else 'id'
+        cursor.execute(f'ALTER TABLE {SENSOR_DATA_TABLE} ADD CONSTRAINT {primary_key} PRIMARY KEY ({primary_key_columns})')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {SENSOR_DATA_TABLE} ADD CONSTRAINT {name} {definition}')
+
+        if partitioned:
+            cursor.execute(f'SELECT MIN("timestamp") FROM {old_table}')
+            oldest = cursor.fetchone()[0] or timezone.now()
+            create_default_partition(connection)
+            create_month_partitions(oldest, add_months(month_start(timezone.now()), MONTHS_AHEAD + 1), connection)
+
+        # Columns are in the same order because the new table was created LIKE the old one
+        cursor.execute(f'INSERT INTO {SENSOR_DATA_TABLE} SELECT * FROM {old_table}')
+        cursor.execute(f'SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {SENSOR_DATA_TABLE}', [sequence])
+        # On a partitioned table each index is built on every partition
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+        cursor.execute(f'DROP TABLE {old_table}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {SENSOR_DATA_TABLE}_id_seq')
+
+
+def partition_sensor_data(apps, schema_editor):
+    _rebuild_sensor_data(schema_editor, partitioned=True)
+
+
+def unpartition_sensor_data(apps, schema_editor):
+    _rebuild_sensor_data(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_sensordata_timestamp_brin'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_sensor_data, unpartition_sensor_data),
+    ]
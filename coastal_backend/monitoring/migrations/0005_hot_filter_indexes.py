@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-15 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0004_sensordata_partition_by_month'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-created_at'], name='monitoring_alert_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('status', 'resolved')), fields=['resolved_at'], name='monitoring_alert_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataingestionlog',
+            index=models.Index(fields=['-created_at'], name='monitoring__created_a6c32c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='riskassessment',
+            index=models.Index(fields=['-created_at', 'risk_score'], name='monitoring__created_aa58af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['location', '-timestamp'], name='monitoring__locatio_d86962_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['created_at'], name='monitoring__created_ca500e_idx'),
+        ),
+    ]
@@ -1,7 +1,92 @@
+import time
+from datetime import timedelta
+from functools import lru_cache
+from typing import List
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .fields import ORJSONField
+
+
+class CachedCountQuerySet(models.QuerySet):
+    """QuerySet whose unfiltered count() on a large table is served from the cache
+
+    Counting every row of a time-series table is a full scan, so once a table
+    holds more than ``cache_counts_larger_than`` rows its total is cached for
+    ``count_cache_timeout`` seconds. Filtered, sliced or distinct counts
+    always hit the database. The precache_table_counts task refreshes the
+    cached totals so requests rarely pay for the scan.
+    """
+    cache_counts_larger_than = 10000
+    count_cache_timeout = 3600
+
+    def _count_cache_key(self) -> str:
+        return f'table_count:{self.model._meta.label_lower}'
+
+    def _is_full_table(self) -> bool:
+        query = self.query
+        return not (query.has_filters() or query.is_sliced or query.distinct or query.combinator)
+
+    def count(self):
+        if self._result_cache is not None or not self._is_full_table():
+            return super().count()
+
+        count = cache.get(self._count_cache_key())
+        if count is None:
+            count = self.precache_count()
+        return count
+
+    def precache_count(self) -> int:
+        """Count every row and cache the total if the table is large enough"""
+        count = super(CachedCountQuerySet, self.model._default_manager.all()).count()
+        if count > self.cache_counts_larger_than:
+            cache.set(self._count_cache_key(), count, self.count_cache_timeout)
+        return count
+
+
+class _SubqueryCount(models.Subquery):
+    """Scalar subquery counting the rows (or distinct ``field`` values) of a queryset"""
+    output_field = models.IntegerField()
+
+    def __init__(self, queryset, field='pk', distinct=False):
+        count = models.Func(models.F(field), function='COUNT', output_field=models.IntegerField())
+        if distinct:
+            count.template = '%(function)s(DISTINCT %(expressions)s)'
+        # Func is not an aggregate, so no GROUP BY is added to the subquery
+        super().__init__(queryset.order_by().values(n=count))
+
+
+class CoastalLocationQuerySet(models.QuerySet):
+    def dashboard_counts(self, high_risk_score: float = 0.7, since_hours: int = 24) -> dict:
+        """Active locations, active alerts and recent high-risk locations in one query"""
+        since = timezone.now() - timedelta(hours=since_hours)
+        counts = self.order_by().aggregate(
+            total_locations=models.Count('pk', filter=models.Q(is_active=True)),
+            # Each subquery is the same for every row; Max only lifts it into the aggregate
+            active_alerts=models.Max(_SubqueryCount(Alert.objects.filter(status='active'))),
+            high_risk_locations=models.Max(_SubqueryCount(
+                RiskAssessment.objects.filter(risk_score__gte=high_risk_score, created_at__gte=since),
+                field='location', distinct=True
+            ))
+        )
+        # Alerts and assessments cannot exist without a location, so an empty table means zero
+        return {name: value or 0 for name, value in counts.items()}
+
+    def with_dashboard_counts(self):
+        """Annotate latest_risk_score and active_alerts_count in the same query"""
+        latest_risk_score = RiskAssessment.objects.filter(
+            location=models.OuterRef('pk')
+        ).order_by('-created_at').values('risk_score')[:1]
+        return self.annotate(
+            latest_risk_score=models.Subquery(latest_risk_score),
+            active_alerts_count=models.Count('alerts', filter=models.Q(alerts__status='active'))
+        ).order_by(*self.model._meta.ordering)  # Meta.ordering is dropped from GROUP BY queries
+
 
 class CoastalLocation(models.Model):
     """Model representing a coastal monitoring location"""
@@ -18,6 +103,8 @@ class CoastalLocation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CoastalLocationQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
 
@@ -25,6 +112,48 @@ class CoastalLocation(models.Model):
         return f"{self.name} ({self.station_id})"
 
 
+# Version number in the cache; bumping it drops the copy of every process sharing it
+_ACTIVE_LOCATIONS_VERSION_KEY = 'active_locations_version'
+# With a process-local cache, other processes never see the version bump, so
+# their copy is also reloaded at least this often (seconds)
+ACTIVE_LOCATIONS_LOCAL_TTL = 60
+
+
+@lru_cache(maxsize=1)
+def _active_locations(version: int, period: int) -> tuple:
+    return tuple(CoastalLocation.objects.filter(is_active=True))
+
+
+def _cache_is_process_local() -> bool:
+    return isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_active_locations() -> List[CoastalLocation]:
+    """Active locations, kept in process memory until any location changes
+
+    The monitoring.signals receivers call invalidate_active_locations() when
+    a location is saved or deleted. QuerySet.update() and bulk_create() send
+    no signals, so call it yourself after those.
+
+    The version is only seen by other processes (Celery workers, other web
+    workers) when they share the cache, i.e. REDIS_CACHE_URL is set. With the
+    default local-memory cache each process instead reloads the list every
+    ACTIVE_LOCATIONS_LOCAL_TTL seconds, so changes made elsewhere reach it
+    within a minute.
+    """
+    version = cache.get_or_set(_ACTIVE_LOCATIONS_VERSION_KEY, 0, None)
+    period = int(time.monotonic() // ACTIVE_LOCATIONS_LOCAL_TTL) if _cache_is_process_local() else 0
+    return list(_active_locations(version, period))
+
+
+def invalidate_active_locations() -> None:
+    try:
+        cache.incr(_ACTIVE_LOCATIONS_VERSION_KEY)
+    except ValueError:
+        cache.set(_ACTIVE_LOCATIONS_VERSION_KEY, 1, None)
+    _active_locations.cache_clear()
+
+
 class SensorData(models.Model):
     """Model for storing real-time sensor data from coastal locations"""
     MEASUREMENT_TYPES = [
@@ -46,11 +175,22 @@ class SensorData(models.Model):
     quality_flag = models.CharField(max_length=10, default='good')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CachedCountQuerySet.as_manager()
+
     class Meta:
         ordering = ['-timestamp']
         indexes = [
+            # Serves the newest-reading-per-type queries (DISTINCT ON on PostgreSQL)
+            # without a sort; PostgreSQL also gets a BRIN index on timestamp
+            # for time-range scans (migration 0003), and the table is
+            # partitioned by month on timestamp there (migration 0004, see
+            # monitoring/partitioning.py)
             models.Index(fields=['location', 'measurement_type', '-timestamp']),
             models.Index(fields=['timestamp']),
+            # Per-location time-range listings (SensorDataViewSet)
+            models.Index(fields=['location', '-timestamp']),
+            # Retention cleanup and ingestion freshness checks filter on created_at
+            models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
@@ -71,18 +211,22 @@ class RiskAssessment(models.Model):
         validators=[MinValueValidator(0.0), MaxValueValidator(1.0)]
     )
     risk_level = models.CharField(max_length=10, choices=RISK_LEVELS)
-    prediction_data = models.JSONField()  # Store the input data used for prediction
+    prediction_data = ORJSONField()  # Store the input data used for prediction
     model_version = models.CharField(max_length=50)
     confidence = models.FloatField(
         validators=[MinValueValidator(0.0), MaxValueValidator(1.0)]
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CachedCountQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['location', '-created_at']),
             models.Index(fields=['risk_level', '-created_at']),
+            # Retention cleanup and the dashboard's recent high-risk count
+            models.Index(fields=['-created_at', 'risk_score']),
         ]
 
     def __str__(self):
@@ -128,6 +272,16 @@ class Alert(models.Model):
         indexes = [
             models.Index(fields=['location', 'status', '-created_at']),
             models.Index(fields=['severity', 'status']),
+            # Small partial indexes for the active alert list and stuck-alert
+            # health check, and for expiring resolved alerts
+            models.Index(
+                fields=['-created_at'], condition=models.Q(status='active'),
+                name='monitoring_alert_active_idx'
+            ),
+            models.Index(
+                fields=['resolved_at'], condition=models.Q(status='resolved'),
+                name='monitoring_alert_resolved_idx'
+            ),
         ]
 
     def __str__(self):
@@ -152,6 +306,9 @@ class DataIngestionLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.source} - {self.status} ({self.records_processed} records)"
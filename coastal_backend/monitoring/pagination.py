@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TimestampCursorPagination(CursorPagination):
+    """Cursor pagination for time-series lists, newest first
+    
+    The cursor encodes the last ordering value seen, so each page is an
+    index seek on that column instead of an OFFSET scan over every
+    earlier row. Pages are requested with ?cursor= from the next/previous
+    links.
+    """
+    ordering = '-timestamp'
+    page_size = 200
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class CreatedAtCursorPagination(TimestampCursorPagination):
+    ordering = '-created_at'
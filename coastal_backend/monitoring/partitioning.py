@@ -0,0 +1,148 @@
+"""
+Monthly range partitioning of the SensorData table on PostgreSQL.
+
+Migration 0004 rebuilds monitoring_sensordata as a table partitioned by
+RANGE ("timestamp"). Each calendar month gets its own partition, and a
+DEFAULT partition catches rows outside every month created so far. Inserts
+then only touch the current month's partition and its indexes. Old months
+can be detached or dropped whole, and timestamp filters skip partitions
+that cannot match.
+
+PostgreSQL requires unique constraints on a partitioned table to include
+the partition key. The primary key therefore becomes (id, timestamp), and
+ids still come from a single sequence. Other backends keep the plain table,
+and every function here does nothing on them.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional
+
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+SENSOR_DATA_TABLE = 'monitoring_sensordata'
+DEFAULT_PARTITION = f'{SENSOR_DATA_TABLE}_default'
+
+
+def month_start(value: datetime) -> datetime:
+    """Midnight UTC on the first day of value's month"""
+    return value.astimezone(dt_timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f'{SENSOR_DATA_TABLE}_p{start:%Y_%m}'
+
+
+def partition_start(name: str) -> Optional[datetime]:
+    """Start of the month a partition_name() partition covers, or None for other tables"""
+    prefix = f'{SENSOR_DATA_TABLE}_p'
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], '%Y_%m').replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        return None
+
+
+def is_partitioned(connection=None) -> bool:
+    """Whether the SensorData table is a partitioned PostgreSQL table"""
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [SENSOR_DATA_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_month_partitions(start: datetime, end: datetime, connection=None) -> List[str]:
+    """Create the monthly partitions covering [start, end) and return the new names
+
+    Rows already sitting in the DEFAULT partition for a new month are moved
+    into it, because PostgreSQL refuses to add a partition whose range
+    overlaps rows in the DEFAULT partition.
+    """
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+
+    created = []
+    month = month_start(start)
+    with connection.cursor() as cursor:
+        while month < end:
+            next_month = add_months(month, 1)
+            name = partition_name(month)
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is None:
+                # Bounds are generated datetimes, never user input
+                bounds = f"FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute(f'CREATE TABLE {name} (LIKE {SENSOR_DATA_TABLE})')
+                    cursor.execute(
+                        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                        f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+                        f'INSERT INTO {name} SELECT * FROM moved',
+                        [month, next_month]
+                    )
+                    # Attaching also builds the parent's indexes on the new partition
+                    cursor.execute(f'ALTER TABLE {SENSOR_DATA_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}')
+                created.append(name)
+            month = next_month
+
+    return created
+
+
+def create_default_partition(connection=None) -> None:
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {SENSOR_DATA_TABLE} DEFAULT')
+
+
+def ensure_sensor_data_partitions(months_ahead: int = 3, connection=None) -> List[str]:
+    """Create partitions from the current month through ``months_ahead`` months ahead"""
+    now = timezone.now()
+    return create_month_partitions(now, add_months(month_start(now), months_ahead + 1), connection)
+
+
+
+def drop_partitions_before(cutoff: datetime, connection=None) -> List[str]:
+    """Drop every monthly partition whose rows were all ingested before cutoff
+
+    Dropping a partition removes a month of readings without scanning,
+    deleting or vacuuming any rows. Partitions are keyed on the reading
+    timestamp but retention is on created_at, so a partition is only
+    dropped when its whole timestamp range ends on or before cutoff and its
+    newest created_at (an index lookup) is also older than cutoff; backfilled
+    old readings are kept until they have been stored for the full period.
+    Rows in partitions that are not dropped are left for the caller.
+    """
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+
+    dropped = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            [SENSOR_DATA_TABLE]
+        )
+        for name in sorted(row[0] for row in cursor.fetchall()):
+            start = partition_start(name)
+            if start is None or add_months(start, 1) > cutoff:
+                continue
+            cursor.execute(f'SELECT MAX(created_at) FROM {name}')
+            newest = cursor.fetchone()[0]
+            if newest is None or newest < cutoff:
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+
+    return dropped
@@ -10,11 +10,17 @@ class CoastalLocationSerializer(serializers.ModelSerializer):
         model = CoastalLocation
         fields = '__all__'
     
+    # CoastalLocationViewSet annotates both values onto listed locations;
+    # locations from other querysets fall back to a query each
+    
     def get_latest_risk_score(self, obj):
-        latest_assessment = obj.risk_assessments.first()
-        return latest_assessment.risk_score if latest_assessment else None
+        if hasattr(obj, 'latest_risk_score'):
+            return obj.latest_risk_score
+        return obj.risk_assessments.order_by('-created_at').values_list('risk_score', flat=True).first()
     
     def get_active_alerts_count(self, obj):
+        if hasattr(obj, 'active_alerts_count'):
+            return obj.active_alerts_count
         return obj.alerts.filter(status='active').count()
 
 
@@ -26,8 +32,25 @@ class SensorDataSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class _MemoizedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField that looks each pk up once per serializer instance
+    
+    A ListSerializer validates every item with the same child fields, so a
+    batch of readings costs one query per distinct location instead of one
+    per reading.
+    """
+    
+    def to_internal_value(self, data):
+        instances = self.__dict__.setdefault('_instances', {})
+        key = str(data)
+        if key not in instances:
+            instances[key] = super().to_internal_value(data)
+        return instances[key]
+
+
 class SensorDataCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating sensor data via API"""
+    location = _MemoizedPrimaryKeyRelatedField(queryset=CoastalLocation.objects.all())
     
     class Meta:
         model = SensorData
@@ -70,14 +93,26 @@ class LocationDetailSerializer(serializers.ModelSerializer):
         model = CoastalLocation
         fields = '__all__'
     
+    # CoastalLocationViewSet.retrieve prefetches each relation into the
+    # attribute read below; other callers fall back to a query per relation
+    
     def get_recent_sensor_data(self, obj):
-        recent_data = obj.sensor_data.all()[:10]  # Last 10 readings
+        if hasattr(obj, 'recent_sensor_data_list'):
+            recent_data = obj.recent_sensor_data_list
+        else:
+            recent_data = obj.sensor_data.all()[:10]  # Last 10 readings
         return SensorDataSerializer(recent_data, many=True).data
     
     def get_latest_risk_assessment(self, obj):
-        latest = obj.risk_assessments.first()
+        if hasattr(obj, 'latest_risk_assessment_list'):
+            latest = obj.latest_risk_assessment_list[0] if obj.latest_risk_assessment_list else None
+        else:
+            latest = obj.risk_assessments.first()
         return RiskAssessmentSerializer(latest).data if latest else None
     
     def get_active_alerts(self, obj):
-        active_alerts = obj.alerts.filter(status='active')
+        if hasattr(obj, 'active_alerts_list'):
+            active_alerts = obj.active_alerts_list
+        else:
+            active_alerts = obj.alerts.filter(status='active')
         return AlertSerializer(active_alerts, many=True).data
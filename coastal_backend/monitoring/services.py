@@ -1,49 +1,280 @@
+import json
 import requests
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
 import logging
+import numpy as np
 
-from .models import CoastalLocation, SensorData, DataIngestionLog
+from .models import CoastalLocation, SensorData, DataIngestionLog, get_active_locations
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_json(response):
+    """Decode a JSON API response with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+class SensorDataCopyWriter:
+    """Writes SensorData rows with PostgreSQL COPY, or bulk_create on other backends
+    
+    COPY streams rows without building and parsing an INSERT statement, which
+    makes it several times faster for large ingestion batches. Rows written
+    through COPY or write_rows do not get their primary keys set.
+    """
+    
+    FIELDS = (
+        'location', 'measurement_type', 'value', 'unit', 'timestamp',
+        'data_source', 'quality_flag', 'created_at'
+    )
+    
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or settings.SENSOR_DATA_BATCH_SIZE
+    
+    @staticmethod
+    def copy_supported() -> bool:
+        """COPY needs PostgreSQL through psycopg 3"""
+        if connection.vendor != 'postgresql':
+            return False
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+        return is_psycopg3
+    
+    def write(self, readings: List[SensorData]) -> int:
+        """Insert the readings and return how many were written"""
+        if not readings:
+            return 0
+        
+        if not self.copy_supported():
+            with transaction.atomic():
+                SensorData.objects.bulk_create(readings, batch_size=self.batch_size)
+            return len(readings)
+        
+        fields = [SensorData._meta.get_field(name) for name in self.FIELDS]
+        # pre_save fills created_at, which COPY would otherwise leave empty
+        return self.write_rows([
+            [field.get_db_prep_save(field.pre_save(reading, True), connection) for field in fields]
+            for reading in readings
+        ])
+    
+    def write_rows(self, rows: List[tuple]) -> int:
+        """Insert database-ready value tuples in FIELDS order, without model instances
+        
+        Uses COPY where supported and batched executemany INSERTs elsewhere.
+        """
+        if not rows:
+            return 0
+        
+        quote_name = connection.ops.quote_name
+        table = quote_name(SensorData._meta.db_table)
+        columns = ', '.join(quote_name(SensorData._meta.get_field(name).column) for name in self.FIELDS)
+        
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.copy_supported():
+                with cursor.copy(f'COPY {table} ({columns}) FROM STDIN') as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                sql = f'INSERT INTO {table} ({columns}) VALUES ({", ".join(["%s"] * len(self.FIELDS))})'
+                for start in range(0, len(rows), self.batch_size):
+                    cursor.executemany(sql, rows[start:start + self.batch_size])
+        return len(rows)
+
+
+class SensorDataBuffer:
+    """Redis list that queues validated readings for flush_sensor_buffer to insert
+    
+    The API pushes readings here and returns at once, and the periodic flush
+    task pops them in batches and writes each batch with SensorDataCopyWriter.
+    Thousands of one-row INSERTs on request threads become a few COPYs (or
+    batched INSERTs) off the request path. Buffering is enabled by setting
+    SENSOR_DATA_BUFFER_URL; readings buffered at any moment are not yet
+    visible to queries.
+    """
+    
+    FIELDS = ('location_id', 'measurement_type', 'value', 'unit', 'timestamp', 'data_source', 'quality_flag')
+    
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
+        import redis
+        self.client = redis.Redis.from_url(url or settings.SENSOR_DATA_BUFFER_URL)
+        self.key = key or settings.SENSOR_DATA_BUFFER_KEY
+    
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.SENSOR_DATA_BUFFER_URL)
+    
+    def _encode(self, reading: SensorData) -> str:
+        return json.dumps({
+            name: getattr(reading, name).isoformat() if name == 'timestamp' else getattr(reading, name)
+            for name in self.FIELDS
+        })
+    
+    def push(self, readings: List[Dict]) -> int:
+        """Queue validated serializer data (one dict per reading) and return the buffer length"""
+        items = [self._encode(SensorData(**attrs)) for attrs in readings]
+        return self.client.rpush(self.key, *items) if items else self.client.llen(self.key)
+    
+    def pop(self, count: int) -> List[SensorData]:
+        """Remove up to count readings from the front of the buffer"""
+        items = self.client.lpop(self.key, count) or []
+        readings = []
+        for item in items:
+            attrs = json.loads(item)
+            attrs['timestamp'] = datetime.fromisoformat(attrs['timestamp'])
+            readings.append(SensorData(**attrs))
+        return readings
+    
+    def requeue(self, readings: List[SensorData]) -> None:
+        """Put popped readings back at the front of the buffer, in their original order"""
+        items = [self._encode(reading) for reading in reversed(readings)]
+        if items:
+            self.client.lpush(self.key, *items)
+
+
+@dataclass(slots=True)
+class IngestionBatch:
+    """Readings parsed from one API source for one location, waiting to be written"""
+    source: str
+    endpoint: str
+    started_at: float
+    readings: List[SensorData] = field(default_factory=list)
+    status: str = 'success'
+    error_message: str = ''
+
+
 class DataIngestionService:
     """Service for ingesting real-time coastal data from external APIs"""
     
     def __init__(self):
         self.apis = settings.COASTAL_DATA_APIS
+        self.writer = SensorDataCopyWriter()
+        
+        # Ingestion logs are buffered and written together by flush_logs()
+        self._log_buffer = []
+        
+        # Reuse TCP/TLS connections across requests, including from worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.INGESTION_MAX_WORKERS,
+            pool_maxsize=settings.INGESTION_MAX_WORKERS
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def ingest_all_locations(self):
         """Ingest data for all active coastal locations"""
-        locations = CoastalLocation.objects.filter(is_active=True)
+        locations = get_active_locations()
         
-        for location in locations:
-            try:
-                # Ingest from NOAA
-                self.ingest_noaa_data(location)
-                # Ingest from USGS (if applicable)
-                self.ingest_usgs_data(location)
-            except Exception as e:
-                logger.error(f"Error ingesting data for {location.name}: {str(e)}")
+        # The API calls are I/O bound, so every (location, source) pair is fetched
+        # concurrently; worker threads never touch the database
+        with ThreadPoolExecutor(max_workers=settings.INGESTION_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(self._fetch_in_thread, fetch, location): location.pk
+                for location in locations
+                # Ingest from NOAA, and from USGS (if applicable)
+                for fetch in (self.fetch_noaa_data, self.fetch_usgs_data)
+            }
+            batches_by_location = {}
+            for future in as_completed(futures):
+                batch = future.result()
+                if batch is not None:
+                    batches_by_location.setdefault(futures[future], []).append(batch)
+        
+        # One write per location on this thread's connection, as ingest_location
+        # does, so a failed write only loses that location's readings
+        for batches in batches_by_location.values():
+            self.write_batches(batches)
+        self.flush_logs()
+    
+    def ingest_location(self, location: CoastalLocation) -> int:
+        """Ingest NOAA and USGS data for one location with a single write"""
+        return self.write_batches([self.fetch_noaa_data(location), self.fetch_usgs_data(location)])
+    
+    def write_batches(self, batches: List[IngestionBatch]) -> int:
+        """Write the readings of every batch together, buffer a log per batch and return the total"""
+        try:
+            records_processed = self.writer.write(
+                [reading for batch in batches for reading in batch.readings]
+            )
+            written = True
+        except Exception as e:
+            records_processed = 0
+            written = False
+            for batch in batches:
+                batch.status = 'error'
+                batch.error_message = f"Data processing error: {str(e)}"
+            logger.error(f"Error writing sensor data: {str(e)}")
+        
+        for batch in batches:
+            # Log the ingestion attempt; call flush_logs() to write it
+            self._log_buffer.append(DataIngestionLog(
+                source=batch.source,
+                endpoint=batch.endpoint,
+                status=batch.status,
+                records_processed=len(batch.readings) if written else 0,
+                error_message=batch.error_message,
+                execution_time=time.time() - batch.started_at
+            ))
+        
+        return records_processed
+    
+    def flush_logs(self) -> int:
+        """Write the buffered ingestion logs in one INSERT and return how many were written"""
+        logs, self._log_buffer = self._log_buffer, []
+        if logs:
+            DataIngestionLog.objects.bulk_create(logs, batch_size=100)
+        return len(logs)
+    
+    @staticmethod
+    def _fetch_in_thread(fetch, location: CoastalLocation) -> Optional[IngestionBatch]:
+        try:
+            return fetch(location)
+        except Exception as e:
+            logger.error(f"Error ingesting data for {location.name}: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _parse_noaa_time(value: str) -> datetime:
+        """Parse a NOAA reading time; requests ask for GMT, so the result is UTC-aware"""
+        return datetime.strptime(value, '%Y-%m-%d %H:%M').replace(tzinfo=dt_timezone.utc)
     
     def ingest_noaa_data(self, location: CoastalLocation):
         """Ingest data from NOAA Tides and Currents API"""
-        start_time = time.time()
-        records_processed = 0
-        error_message = ""
+        records_processed = self.write_batches([self.fetch_noaa_data(location)])
+        self.flush_logs()
+        return records_processed
+    
+    def fetch_noaa_data(self, location: CoastalLocation) -> IngestionBatch:
+        """Fetch and parse NOAA Tides and Currents readings without writing them"""
+        base_url = self.apis['NOAA']['BASE_URL']
+        batch = IngestionBatch(source='NOAA', endpoint=base_url, started_at=time.time())
+        readings = batch.readings
         
         try:
-            # NOAA API parameters
-            base_url = self.apis['NOAA']['BASE_URL']
+            # Both products cover the same one-hour window
+            now = timezone.now()
+            begin_date = (now - timedelta(hours=1)).strftime('%Y%m%d %H:%M')
+            end_date = now.strftime('%Y%m%d %H:%M')
             
             # Get water level data
             water_level_params = {
-                'begin_date': (timezone.now() - timedelta(hours=1)).strftime('%Y%m%d %H:%M'),
-                'end_date': timezone.now().strftime('%Y%m%d %H:%M'),
+                'begin_date': begin_date,
+                'end_date': end_date,
                 'station': location.station_id,
                 'product': 'water_level',
                 'datum': 'MLLW',
@@ -52,27 +283,26 @@ class DataIngestionService:
                 'format': 'json'
             }
             
-            response = requests.get(base_url, params=water_level_params, timeout=30)
+            response = self.session.get(base_url, params=water_level_params, timeout=30)
             
             if response.status_code == 200:
-                data = response.json()
+                data = _parse_json(response)
                 if 'data' in data:
                     for reading in data['data']:
-                        sensor_data = SensorData.objects.create(
+                        readings.append(SensorData(
                             location=location,
                             measurement_type='water_level',
                             value=float(reading['v']),
                             unit='meters',
-                            timestamp=datetime.strptime(reading['t'], '%Y-%m-%d %H:%M'),
+                            timestamp=self._parse_noaa_time(reading['t']),
                             data_source='NOAA',
                             quality_flag=reading.get('q', 'good')
-                        )
-                        records_processed += 1
+                        ))
             
             # Get meteorological data
             met_params = {
-                'begin_date': (timezone.now() - timedelta(hours=1)).strftime('%Y%m%d %H:%M'),
-                'end_date': timezone.now().strftime('%Y%m%d %H:%M'),
+                'begin_date': begin_date,
+                'end_date': end_date,
                 'station': location.station_id,
                 'product': 'meteorological',
                 'units': 'metric',
@@ -80,81 +310,74 @@ class DataIngestionService:
                 'format': 'json'
             }
             
-            met_response = requests.get(base_url, params=met_params, timeout=30)
+            met_response = self.session.get(base_url, params=met_params, timeout=30)
             
             if met_response.status_code == 200:
-                met_data = met_response.json()
+                met_data = _parse_json(met_response)
                 if 'data' in met_data:
                     for reading in met_data['data']:
+                        # Parse the timestamp once for all measurements in the reading
+                        timestamp = self._parse_noaa_time(reading['t'])
+                        
                         # Wind speed
                         if 's' in reading and reading['s']:
-                            SensorData.objects.create(
+                            readings.append(SensorData(
                                 location=location,
                                 measurement_type='wind_speed',
                                 value=float(reading['s']),
                                 unit='m/s',
-                                timestamp=datetime.strptime(reading['t'], '%Y-%m-%d %H:%M'),
+                                timestamp=timestamp,
                                 data_source='NOAA'
-                            )
-                            records_processed += 1
+                            ))
                         
                         # Wind direction
                         if 'd' in reading and reading['d']:
-                            SensorData.objects.create(
+                            readings.append(SensorData(
                                 location=location,
                                 measurement_type='wind_direction',
                                 value=float(reading['d']),
                                 unit='degrees',
-                                timestamp=datetime.strptime(reading['t'], '%Y-%m-%d %H:%M'),
+                                timestamp=timestamp,
                                 data_source='NOAA'
-                            )
-                            records_processed += 1
+                            ))
                         
                         # Air pressure
                         if 'p' in reading and reading['p']:
-                            SensorData.objects.create(
+                            readings.append(SensorData(
                                 location=location,
                                 measurement_type='air_pressure',
                                 value=float(reading['p']),
                                 unit='mb',
-                                timestamp=datetime.strptime(reading['t'], '%Y-%m-%d %H:%M'),
+                                timestamp=timestamp,
                                 data_source='NOAA'
-                            )
-                            records_processed += 1
+                            ))
             
-            status = 'success'
-        
         except requests.RequestException as e:
-            error_message = f"API request failed: {str(e)}"
-            status = 'error'
-            logger.error(f"NOAA API error for {location.name}: {error_message}")
+            batch.status = 'error'
+            batch.error_message = f"API request failed: {str(e)}"
+            logger.error(f"NOAA API error for {location.name}: {batch.error_message}")
         
         except Exception as e:
-            error_message = f"Data processing error: {str(e)}"
-            status = 'error'
-            logger.error(f"NOAA processing error for {location.name}: {error_message}")
+            batch.status = 'error'
+            batch.error_message = f"Data processing error: {str(e)}"
+            logger.error(f"NOAA processing error for {location.name}: {batch.error_message}")
         
-        # Log the ingestion attempt
-        DataIngestionLog.objects.create(
-            source='NOAA',
-            endpoint=base_url,
-            status=status,
-            records_processed=records_processed,
-            error_message=error_message,
-            execution_time=time.time() - start_time
-        )
-        
-        return records_processed
+        # Readings parsed before a failure are kept and written with the batch
+        return batch
     
     def ingest_usgs_data(self, location: CoastalLocation):
         """Ingest data from USGS Water Services API"""
-        start_time = time.time()
-        records_processed = 0
-        error_message = ""
+        records_processed = self.write_batches([self.fetch_usgs_data(location)])
+        self.flush_logs()
+        return records_processed
+    
+    def fetch_usgs_data(self, location: CoastalLocation) -> IngestionBatch:
+        """Fetch and parse USGS Water Services readings without writing them"""
+        base_url = self.apis['USGS']['BASE_URL']
+        batch = IngestionBatch(source='USGS', endpoint=base_url, started_at=time.time())
+        readings = batch.readings
         
         try:
-            base_url = self.apis['USGS']['BASE_URL']
-            
             # USGS parameters for water data
             params = {
                 'format': 'json',
@@ -163,10 +386,10 @@ class DataIngestionService:
                 'parameterCd': '00065,00060',  # Water level and discharge
             }
             
-            response = requests.get(base_url, params=params, timeout=30)
+            response = self.session.get(base_url, params=params, timeout=30)
             
             if response.status_code == 200:
-                data = response.json()
+                data = _parse_json(response)
                 if 'value' in data and 'timeSeries' in data['value']:
                     for series in data['value']['timeSeries']:
                         parameter_code = series['variable']['variableCode'][0]['value']
@@ -176,57 +399,50 @@ class DataIngestionService:
                         
                         for value_data in series['values'][0]['value']:
                             if value_data['value'] != '-999999':  # Filter out no-data values
-                                SensorData.objects.create(
+                                readings.append(SensorData(
                                     location=location,
                                     measurement_type=measurement_type,
                                     value=float(value_data['value']),
                                     unit=unit,
                                     timestamp=datetime.fromisoformat(value_data['dateTime'].replace('Z', '+00:00')),
                                     data_source='USGS'
-                                )
-                                records_processed += 1
+                                ))
             
-            status = 'success'
-        
         except requests.RequestException as e:
-            error_message = f"API request failed: {str(e)}"
-            status = 'error'
-            logger.error(f"USGS API error for {location.name}: {error_message}")
+            batch.status = 'error'
+            batch.error_message = f"API request failed: {str(e)}"
+            logger.error(f"USGS API error for {location.name}: {batch.error_message}")
         
         except Exception as e:
-            error_message = f"Data processing error: {str(e)}"
-            status = 'error'
-            logger.error(f"USGS processing error for {location.name}: {error_message}")
+            batch.status = 'error'
+            batch.error_message = f"Data processing error: {str(e)}"
+            logger.error(f"USGS processing error for {location.name}: {batch.error_message}")
         
-        # Log the ingestion attempt
-        DataIngestionLog.objects.create(
-            source='USGS',
-            endpoint=base_url,
-            status=status,
-            records_processed=records_processed,
-            error_message=error_message,
-            execution_time=time.time() - start_time
-        )
-        
-        return records_processed
+        # Readings parsed before a failure are kept and written with the batch
+        return batch
     
     def get_latest_sensor_data(self, location: CoastalLocation, hours: int = 24) -> Dict:
         """Get the latest sensor data for a location within specified hours"""
         since = timezone.now() - timedelta(hours=hours)
         
+        readings = location.sensor_data.filter(
+            timestamp__gte=since
+        ).order_by('measurement_type', '-timestamp').values_list(
+            'measurement_type', 'value', 'unit', 'timestamp', 'data_source'
+        )
+        
+        if connection.vendor == 'postgresql':
+            # DISTINCT ON returns just the newest row per measurement type
+            readings = readings.distinct('measurement_type')
+        
         data = {}
-        for measurement_type, _ in SensorData.MEASUREMENT_TYPES:
-            latest = location.sensor_data.filter(
-                measurement_type=measurement_type,
-                timestamp__gte=since
-            ).first()
-            
-            if latest:
+        for measurement_type, value, unit, timestamp, source in readings:
+            if measurement_type not in data:
                 data[measurement_type] = {
-                    'value': latest.value,
-                    'unit': latest.unit,
-                    'timestamp': latest.timestamp,
-                    'source': latest.data_source
+                    'value': value,
+                    'unit': unit,
+                    'timestamp': timestamp,
+                    'source': source
                 }
         
         return data
@@ -246,30 +462,54 @@ class DataValidationService:
         'salinity': {'min': 0, 'max': 40},       # ppt
     }
     
+    # The same ranges as parallel min/max arrays indexed by measurement type id,
+    # for the vectorised check in clean_sensor_data
+    _RANGE_IDS = {measurement_type: i for i, measurement_type in enumerate(VALIDATION_RANGES)}
+    _RANGE_MIN = np.array([bounds['min'] for bounds in VALIDATION_RANGES.values()], dtype=np.float64)
+    _RANGE_MAX = np.array([bounds['max'] for bounds in VALIDATION_RANGES.values()], dtype=np.float64)
+    
     @classmethod
     def validate_sensor_reading(cls, measurement_type: str, value: float) -> bool:
         """Validate if a sensor reading is within reasonable bounds"""
-        if measurement_type not in cls.VALIDATION_RANGES:
+        return cls._within_range(measurement_type, value)
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _within_range(measurement_type: str, value: float) -> bool:
+        # Memoized on the exact value: rounding the key would accept readings
+        # just outside a bound
+        if measurement_type not in DataValidationService.VALIDATION_RANGES:
             return True  # Allow unknown measurement types
         
-        range_config = cls.VALIDATION_RANGES[measurement_type]
+        range_config = DataValidationService.VALIDATION_RANGES[measurement_type]
         return range_config['min'] <= value <= range_config['max']
     
     @classmethod
     def clean_sensor_data(cls, data: List[Dict]) -> List[Dict]:
         """Clean and validate a list of sensor data readings"""
-        cleaned_data = []
+        readings = [
+            reading for reading in data
+            if reading.get('measurement_type') and reading.get('value') is not None
+        ]
         
-        for reading in data:
-            measurement_type = reading.get('measurement_type')
-            value = reading.get('value')
-            
-            if measurement_type and value is not None:
-                if cls.validate_sensor_reading(measurement_type, float(value)):
-                    cleaned_data.append(reading)
-                else:
-                    logger.warning(
-                        f"Invalid sensor reading filtered out: {measurement_type}={value}"
-                    )
+        # Check every reading against its range in one vectorised comparison;
+        # unknown measurement types are always valid
+        values = np.fromiter((float(reading['value']) for reading in readings), dtype=np.float64, count=len(readings))
+        range_ids = np.fromiter(
+            (cls._RANGE_IDS.get(reading['measurement_type'], -1) for reading in readings),
+            dtype=np.intp, count=len(readings)
+        )
+        known = range_ids >= 0
+        valid = ~known | ((values >= cls._RANGE_MIN[range_ids]) & (values <= cls._RANGE_MAX[range_ids]))
+        
+        cleaned_data = []
+        for reading, is_valid in zip(readings, valid.tolist()):
+            if is_valid:
+                cleaned_data.append(reading)
+            else:
+                logger.warning(
+                    f"Invalid sensor reading filtered out: {reading['measurement_type']}={reading['value']}"
+                )
         
         return cleaned_data
+
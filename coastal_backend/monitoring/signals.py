@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CoastalLocation, invalidate_active_locations
+
+
+@receiver([post_save, post_delete], sender=CoastalLocation)
+def location_changed(sender, **kwargs):
+    """Drop the cached active locations whenever a location is saved or deleted"""
+    invalidate_active_locations()
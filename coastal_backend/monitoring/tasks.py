@@ -1,33 +1,93 @@
-from celery import shared_task
+from celery import chord, shared_task
 from django.utils import timezone
 from datetime import timedelta
+from dataclasses import asdict
+from django.db import transaction
+from django.db.models import Count, IntegerField, Value
 import logging
 
-from .services import DataIngestionService
+from .services import DataIngestionService, SensorDataBuffer, SensorDataCopyWriter
+from .partitioning import drop_partitions_before, ensure_sensor_data_partitions
 from ml_integration.services import MLPredictionService
-from .models import CoastalLocation, Alert, SensorData, RiskAssessment, DataIngestionLog
+from .models import CoastalLocation, Alert, SensorData, RiskAssessment, DataIngestionLog, get_active_locations
 
 logger = logging.getLogger(__name__)
 
+CLEANUP_CHUNK_SIZE = 10000
+
+
+def _raw_delete_in_chunks(queryset, chunk_size=CLEANUP_CHUNK_SIZE):
+    """Delete the matching rows with plain DELETE statements of at most chunk_size rows
+
+    Unlike QuerySet.delete(), no rows are loaded and no signals or Python-side
+    cascades run, so rows that reference these must be deleted first. Short
+    chunks keep each statement's locks brief on large tables.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        chunk = model._base_manager.filter(pk__in=queryset.order_by().values('pk')[:chunk_size])
+        count = chunk._raw_delete(chunk.db)
+        deleted += count
+        if count < chunk_size:
+            return deleted
+
 
 @shared_task
 def ingest_coastal_data():
-    """Celery task to ingest coastal data from external APIs"""
+    """Celery task to ingest coastal data from external APIs
+    
+    Fans out one ingest_location_data task per active location, so a slow
+    station only delays its own task and locations spread across workers,
+    then runs predictions once every location has finished.
+    """
+    location_ids = [location.id for location in get_active_locations()]
+    logger.info(f"Dispatching coastal data ingestion for {len(location_ids)} locations")
+    
+    result = chord(ingest_location_data.s(location_id) for location_id in location_ids)(finalize_ingestion.s())
+    return result.id
+
+
+@shared_task
+def ingest_location_data(location_id):
+    """Celery task to ingest NOAA and USGS data for one location"""
     try:
-        logger.info("Starting coastal data ingestion task")
+        location = CoastalLocation.objects.get(id=location_id)
         
         ingestion_service = DataIngestionService()
-        ingestion_service.ingest_all_locations()
+        records_ingested = ingestion_service.ingest_location(location)
+        ingestion_service.flush_logs()
+        return records_ingested
+        
+    except Exception as e:
+        # Return rather than raise so one failing location does not fail the chord
+        logger.error(f"Error ingesting data for location {location_id}: {str(e)}")
+        return 0
+
+
+@shared_task
+def finalize_ingestion(records_per_location):
+    """Celery task run after every location is ingested to generate predictions"""
+    try:
+        ml_service = MLPredictionService()
+        predictions = ml_service.predict_all_locations()
         
-        logger.info("Coastal data ingestion completed successfully")
-        return "Data ingestion completed"
+        logger.info(
+            f"Coastal data ingestion completed: {sum(records_per_location)} records "
+            f"from {len(records_per_location)} locations, "
+            f"{len(predictions)} predictions generated"
+        )
+        return {
+            'records_ingested': sum(records_per_location),
+            'predictions_generated': len(predictions)
+        }
         
     except Exception as e:
-        logger.error(f"Error in coastal data ingestion task: {str(e)}")
+        logger.error(f"Error finalizing coastal data ingestion: {str(e)}")
         raise
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def run_risk_predictions():
     """Celery task to run ML risk predictions for all locations"""
     try:
@@ -53,23 +113,23 @@ def process_location_data(location_id):
         
         # First ingest latest data
         ingestion_service = DataIngestionService()
-        noaa_records = ingestion_service.ingest_noaa_data(location)
-        usgs_records = ingestion_service.ingest_usgs_data(location)
+        records_ingested = ingestion_service.ingest_location(location)
+        ingestion_service.flush_logs()
         
         # Then run prediction
         ml_service = MLPredictionService()
-        prediction = ml_service.predict_risk(location)
+        prediction = ml_service.predict_risk_cached(location)
         
         logger.info(
             f"Processing completed for {location.name}: "
-            f"{noaa_records + usgs_records} records ingested, "
+            f"{records_ingested} records ingested, "
             f"prediction: {prediction}"
         )
         
         return {
             'location': location.name,
-            'records_ingested': noaa_records + usgs_records,
-            'prediction': prediction
+            'records_ingested': records_ingested,
+            'prediction': asdict(prediction) if prediction else None
         }
         
     except CoastalLocation.DoesNotExist:
@@ -80,40 +140,48 @@ def process_location_data(location_id):
         raise
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def cleanup_old_data():
     """Celery task to clean up old sensor data and logs"""
     try:
         logger.info("Starting data cleanup task")
         
-        # Keep sensor data for 30 days
-        sensor_cutoff = timezone.now() - timedelta(days=30)
-        deleted_sensor_count = SensorData.objects.filter(
-            created_at__lt=sensor_cutoff
-        ).delete()[0]
+        now = timezone.now()
         
-        # Keep risk assessments for 90 days
-        risk_cutoff = timezone.now() - timedelta(days=90)
-        deleted_risk_count = RiskAssessment.objects.filter(
-            created_at__lt=risk_cutoff
-        ).delete()[0]
+        # Keep sensor data for 30 days after ingestion (created_at); on PostgreSQL
+        # months whose rows have all expired are dropped as partitions first
+        sensor_cutoff = now - timedelta(days=30)
+        dropped_partitions = drop_partitions_before(sensor_cutoff)
+        deleted_sensor_count = _raw_delete_in_chunks(
+            SensorData.objects.filter(created_at__lt=sensor_cutoff)
+        )
+        
+        # Keep risk assessments for 90 days, together with the alerts raised from them
+        risk_cutoff = now - timedelta(days=90)
+        with transaction.atomic():
+            deleted_alert_count = _raw_delete_in_chunks(
+                Alert.objects.filter(risk_assessment__created_at__lt=risk_cutoff)
+            )
+            deleted_risk_count = _raw_delete_in_chunks(
+                RiskAssessment.objects.filter(created_at__lt=risk_cutoff)
+            )
         
         # Keep resolved alerts for 30 days
-        alert_cutoff = timezone.now() - timedelta(days=30)
-        deleted_alert_count = Alert.objects.filter(
-            status='resolved',
-            resolved_at__lt=alert_cutoff
-        ).delete()[0]
+        alert_cutoff = now - timedelta(days=30)
+        deleted_alert_count += _raw_delete_in_chunks(
+            Alert.objects.filter(status='resolved', resolved_at__lt=alert_cutoff)
+        )
         
         # Keep ingestion logs for 7 days
-        log_cutoff = timezone.now() - timedelta(days=7)
-        deleted_log_count = DataIngestionLog.objects.filter(
-            created_at__lt=log_cutoff
-        ).delete()[0]
+        log_cutoff = now - timedelta(days=7)
+        deleted_log_count = _raw_delete_in_chunks(
+            DataIngestionLog.objects.filter(created_at__lt=log_cutoff)
+        )
         
         logger.info(
             f"Data cleanup completed: "
             f"{deleted_sensor_count} sensor records, "
+            f"{len(dropped_partitions)} sensor partitions, "
             f"{deleted_risk_count} risk assessments, "
             f"{deleted_alert_count} alerts, "
             f"{deleted_log_count} logs deleted"
@@ -121,6 +189,7 @@ def cleanup_old_data():
         
         return {
             'sensor_records_deleted': deleted_sensor_count,
+            'sensor_partitions_dropped': dropped_partitions,
             'risk_assessments_deleted': deleted_risk_count,
             'alerts_deleted': deleted_alert_count,
             'logs_deleted': deleted_log_count
@@ -131,7 +200,7 @@ def cleanup_old_data():
         raise
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def check_system_health():
     """Celery task to check system health and generate alerts if needed"""
     try:
@@ -139,28 +208,47 @@ def check_system_health():
         
         issues = []
         
-        # Check if data ingestion is working (recent data within last 2 hours)
-        recent_cutoff = timezone.now() - timedelta(hours=2)
-        recent_data_count = SensorData.objects.filter(created_at__gte=recent_cutoff).count()
+        # Recent data within the last 2 hours and alerts active for more than 24 hours
+        now = timezone.now()
+        recent_cutoff = now - timedelta(hours=2)
+        stuck_alert_cutoff = now - timedelta(hours=24)
         
+        # One UNION ALL query returns (kind, location_id, count) rows: recent
+        # readings per location and the stuck alert count
+        recent_per_location = (
+            SensorData.objects.filter(created_at__gte=recent_cutoff).order_by()
+            .values('location_id')
+            .values_list(Value('recent'), 'location_id', Count('pk'))
+        )
+        stuck = (
+            Alert.objects.filter(status='active', created_at__lt=stuck_alert_cutoff).order_by()
+            .values('status')
+            .values_list(Value('stuck'), Value(None, output_field=IntegerField()), Count('pk'))
+        )
+        
+        recent_data_count = 0
+        stuck_alerts = 0
+        fresh_location_ids = set()
+        for kind, location_id, count in recent_per_location.union(stuck, all=True):
+            if kind == 'recent':
+                recent_data_count += count
+                fresh_location_ids.add(location_id)
+            else:
+                stuck_alerts = count
+        
+        # Check if data ingestion is working
         if recent_data_count == 0:
             issues.append("No recent sensor data ingested")
         
-        # Check for stuck alerts (active for more than 24 hours)
-        stuck_alert_cutoff = timezone.now() - timedelta(hours=24)
-        stuck_alerts = Alert.objects.filter(
-            status='active',
-            created_at__lt=stuck_alert_cutoff
-        ).count()
-        
+        # Check for stuck alerts
         if stuck_alerts > 0:
             issues.append(f"{stuck_alerts} alerts have been active for more than 24 hours")
         
         # Check for locations without recent data
-        locations_without_data = []
-        for location in CoastalLocation.objects.filter(is_active=True):
-            if not location.sensor_data.filter(created_at__gte=recent_cutoff).exists():
-                locations_without_data.append(location.name)
+        locations_without_data = [
+            location.name for location in get_active_locations()
+            if location.id not in fresh_location_ids
+        ]
         
         if locations_without_data:
             issues.append(f"No recent data for locations: {', '.join(locations_without_data)}")
@@ -180,3 +268,64 @@ def check_system_health():
     except Exception as e:
         logger.error(f"Error in system health check: {str(e)}")
         raise
+
+
+@shared_task(ignore_result=True)
+def precache_table_counts():
+    """Celery task to refresh the cached row counts of the large time-series tables
+
+    Schedule this more often than CachedCountQuerySet.count_cache_timeout
+    (hourly by default) so unfiltered counts never fall through to a full scan.
+    """
+    counts = {
+        'sensor_data': SensorData.objects.precache_count(),
+        'risk_assessments': RiskAssessment.objects.precache_count()
+    }
+    logger.info(f"Precached table counts: {counts}")
+    return counts
+
+
+@shared_task(ignore_result=True)
+def create_sensor_data_partitions(months_ahead=3):
+    """Celery task to create the upcoming monthly SensorData partitions
+
+    Only does anything on PostgreSQL once migration 0004 has partitioned the
+    table. Schedule it at least monthly so new readings never land in the
+    DEFAULT partition.
+    """
+    created = ensure_sensor_data_partitions(months_ahead)
+    if created:
+        logger.info(f"Created SensorData partitions: {', '.join(created)}")
+    return created
+
+
+@shared_task(ignore_result=True)
+def flush_sensor_buffer(batch_size=2000, max_batches=50):
+    """Celery task to insert the readings queued in the SensorData buffer
+
+    Pops up to batch_size readings at a time and writes each batch in one
+    COPY or batched INSERT, until the buffer is empty or max_batches have
+    been written. A batch that fails to write is put back at the front of
+    the buffer for the next run.
+    """
+    if not SensorDataBuffer.enabled():
+        return 0
+
+    buffer = SensorDataBuffer()
+    writer = SensorDataCopyWriter()
+    written = 0
+    for _ in range(max_batches):
+        readings = buffer.pop(batch_size)
+        if not readings:
+            break
+        try:
+            written += writer.write(readings)
+        except Exception:
+            buffer.requeue(readings)
+            raise
+        if len(readings) < batch_size:
+            break
+
+    if written:
+        logger.info(f"Flushed {written} buffered sensor readings")
+    return written
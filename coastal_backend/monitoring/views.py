@@ -1,21 +1,73 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, Q
+from dataclasses import asdict
+from itertools import islice
+from django.db.models import Count, F, Prefetch, Q
 
 from .models import CoastalLocation, SensorData, RiskAssessment, Alert, DataIngestionLog
+from .pagination import TimestampCursorPagination, CreatedAtCursorPagination
 from .serializers import (
     CoastalLocationSerializer, SensorDataSerializer, SensorDataCreateSerializer,
     RiskAssessmentSerializer, AlertSerializer, DashboardDataSerializer,
     LocationDetailSerializer
 )
-from .services import DataIngestionService, DataValidationService
+from .services import DataIngestionService, DataValidationService, SensorDataBuffer, SensorDataCopyWriter
 from ml_integration.services import MLPredictionService
 
 
+def _select_related_only(queryset, *related_fields):
+    """Join the relations behind related_fields, loading just those columns of them
+    
+    Every column of the queryset's own model is still loaded, since the
+    serializers use fields = '__all__'.
+    """
+    model_fields = [field.name for field in queryset.model._meta.concrete_fields]
+    relations = {field.split('__')[0] for field in related_fields}
+    return queryset.select_related(*relations).only(*model_fields, *related_fields)
+
+
+def _serialized_values(queryset, **related_fields):
+    """The queryset as plain dicts shaped like its ModelSerializer output
+    
+    Every concrete field is keyed by name (foreign keys hold the related
+    pk), and each keyword adds a key read through a join, e.g.
+    location_name='location__name'. Datetimes are left for the renderer
+    to format, which it does the same way the serializer fields would.
+    """
+    model_fields = [field.name for field in queryset.model._meta.concrete_fields]
+    return list(queryset.values(
+        *model_fields, **{key: F(path) for key, path in related_fields.items()}
+    ))
+
+
+def _stream_json_list(queryset, serializer_class, chunk_size=2000):
+    """Yield a JSON array of the serialized queryset, one chunk of rows at a time
+
+    This bypasses DRF rendering, so callers should only use it when the
+    negotiated renderer is JSON.
+    """
+    # Same compact separators and UTF-8 output as JSONRenderer's defaults
+    encoder = JSONEncoder(separators=(',', ':'), ensure_ascii=not api_settings.UNICODE_JSON)
+    rows = queryset.iterator(chunk_size=chunk_size)
+    yield '['
+    separator = ''
+    while chunk := list(islice(rows, chunk_size)):
+        yield separator + ','.join(encoder.encode(serializer_class(row).data) for row in chunk)
+        separator = ','
+    yield ']'
+
+
 class CoastalLocationViewSet(viewsets.ModelViewSet):
     """ViewSet for coastal location management"""
     queryset = CoastalLocation.objects.all()
@@ -26,17 +78,45 @@ class CoastalLocationViewSet(viewsets.ModelViewSet):
             return LocationDetailSerializer
         return CoastalLocationSerializer
     
+    def get_queryset(self):
+        queryset = CoastalLocation.objects.all()
+        
+        if self.action == 'list':
+            # Compute the serializer's per-location values in the list query itself
+            queryset = queryset.with_dashboard_counts()
+        elif self.action == 'retrieve':
+            # One query per relation for LocationDetailSerializer
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'sensor_data',
+                    queryset=SensorData.objects.order_by('-timestamp')[:10],
+                    to_attr='recent_sensor_data_list'
+                ),
+                Prefetch(
+                    'risk_assessments',
+                    queryset=RiskAssessment.objects.order_by('-created_at')[:1],
+                    to_attr='latest_risk_assessment_list'
+                ),
+                Prefetch(
+                    'alerts',
+                    queryset=Alert.objects.filter(status='active').select_related('risk_assessment'),
+                    to_attr='active_alerts_list'
+                )
+            )
+        
+        return queryset
+    
     @action(detail=True, methods=['post'])
     def run_prediction(self, request, pk=None):
         """Trigger ML prediction for a specific location"""
         location = self.get_object()
         ml_service = MLPredictionService()
         
-        prediction = ml_service.predict_risk(location)
+        prediction = ml_service.predict_risk_cached(location)
         if prediction:
             return Response({
                 'status': 'success',
-                'prediction': prediction
+                'prediction': asdict(prediction)
             })
         else:
             return Response({
@@ -53,14 +133,22 @@ class CoastalLocationViewSet(viewsets.ModelViewSet):
         since = timezone.now() - timedelta(hours=hours)
         sensor_data = location.sensor_data.filter(timestamp__gte=since)
         
-        serializer = SensorDataSerializer(sensor_data, many=True)
-        return Response(serializer.data)
+        if request.accepted_renderer.format != 'json':
+            # Browsable API and other renderers need the full data up front
+            return Response(SensorDataSerializer(sensor_data, many=True).data)
+        
+        # Long windows can cover many thousands of readings, so stream them
+        # rather than building every instance and the whole body in memory
+        return StreamingHttpResponse(
+            _stream_json_list(sensor_data, SensorDataSerializer), content_type='application/json'
+        )
 
 
 class SensorDataViewSet(viewsets.ModelViewSet):
     """ViewSet for sensor data management"""
     queryset = SensorData.objects.all()
     serializer_class = SensorDataSerializer
+    pagination_class = TimestampCursorPagination
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -68,7 +156,7 @@ class SensorDataViewSet(viewsets.ModelViewSet):
         return SensorDataSerializer
     
     def get_queryset(self):
-        queryset = SensorData.objects.all()
+        queryset = _select_related_only(SensorData.objects.all(), 'location__name')
         
         # Filter by location if specified
         location_id = self.request.query_params.get('location')
@@ -109,18 +197,42 @@ class SensorDataViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
         
         serializer.is_valid(raise_exception=True)
+        
+        if SensorDataBuffer.enabled():
+            # Accepted but not yet stored: the client gets 202 with a queue count
+            # instead of 201 with the saved rows, and the readings (and any alerts
+            # predicted from them) only appear once flush_sensor_buffer runs
+            validated = serializer.validated_data
+            readings = validated if isinstance(validated, list) else [validated]
+            buffered = SensorDataBuffer().push(readings)
+            return Response({
+                'queued': len(readings),
+                'buffered': buffered
+            }, status=status.HTTP_202_ACCEPTED)
+        
         self.perform_create(serializer)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    def perform_create(self, serializer):
+        if isinstance(serializer, ListSerializer):
+            # COPY (or one INSERT per batch) rather than an INSERT per reading;
+            # the create serializer does not return ids, which COPY cannot set
+            readings = [SensorData(**attrs) for attrs in serializer.validated_data]
+            SensorDataCopyWriter().write(readings)
+            serializer.instance = readings
+        else:
+            super().perform_create(serializer)
 
 
 class RiskAssessmentViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for risk assessment data (read-only)"""
     queryset = RiskAssessment.objects.all()
     serializer_class = RiskAssessmentSerializer
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
-        queryset = RiskAssessment.objects.all()
+        queryset = _select_related_only(RiskAssessment.objects.all(), 'location__name')
         
         # Filter by location if specified
         location_id = self.request.query_params.get('location')
@@ -144,9 +256,13 @@ class AlertViewSet(viewsets.ModelViewSet):
     """ViewSet for alert management"""
     queryset = Alert.objects.all()
     serializer_class = AlertSerializer
+    pagination_class = CreatedAtCursorPagination
     
     def get_queryset(self):
-        queryset = Alert.objects.all()
+        # AlertSerializer reads location.name and risk_assessment.risk_score
+        queryset = _select_related_only(
+            Alert.objects.all(), 'location__name', 'risk_assessment__risk_score'
+        )
         
         # Filter by status if specified
         alert_status = self.request.query_params.get('status')
@@ -182,33 +298,37 @@ class AlertViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+@method_decorator(cache_page(settings.DASHBOARD_CACHE_TIMEOUT), name='get')
 class DashboardView(APIView):
-    """API view for dashboard overview data"""
+    """API view for dashboard overview data
+    
+    The counts come from one aggregate query and the two short lists from one
+    query each; the rendered response is then cached for
+    DASHBOARD_CACHE_TIMEOUT seconds, so most hits run no queries at all.
+    """
     
     def get(self, request):
         """Get dashboard overview statistics"""
-        # Get basic statistics
-        total_locations = CoastalLocation.objects.filter(is_active=True).count()
-        active_alerts = Alert.objects.filter(status='active').count()
-        
-        # Get high risk locations (risk score >= 0.7)
-        high_risk_locations = RiskAssessment.objects.filter(
-            risk_score__gte=0.7,
-            created_at__gte=timezone.now() - timedelta(hours=24)
-        ).values('location').distinct().count()
+        # Location, alert and high risk (risk score >= 0.7) counts in one query
+        counts = CoastalLocation.objects.dashboard_counts()
         
-        # Get latest sensor data (last 10 readings)
-        latest_sensor_data = SensorData.objects.all()[:10]
+        # Get latest sensor data (last 10 readings); ordering explicitly by the
+        # indexed column lets the database read the newest index entries and stop.
+        # Both lists are projected straight to dicts, skipping per-row serializers
+        latest_sensor_data = _serialized_values(
+            SensorData.objects.order_by('-timestamp')[:10], location_name='location__name'
+        )
         
         # Get recent alerts (last 5)
-        recent_alerts = Alert.objects.all()[:5]
+        recent_alerts = _serialized_values(
+            Alert.objects.order_by('-created_at')[:5],
+            location_name='location__name', risk_score='risk_assessment__risk_score'
+        )
         
         dashboard_data = {
-            'total_locations': total_locations,
-            'active_alerts': active_alerts,
-            'high_risk_locations': high_risk_locations,
-            'latest_sensor_data': SensorDataSerializer(latest_sensor_data, many=True).data,
-            'recent_alerts': AlertSerializer(recent_alerts, many=True).data
+            **counts,
+            'latest_sensor_data': latest_sensor_data,
+            'recent_alerts': recent_alerts
         }
         
         serializer = DashboardDataSerializer(dashboard_data)
@@ -241,6 +361,7 @@ class DataIngestionView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(cache_page(settings.HEALTH_CHECK_CACHE_TIMEOUT), name='get')
 class HealthCheckView(APIView):
     """Simple health check endpoint"""
     
@@ -9,35 +9,48 @@ import subprocess
 import time
 import requests
 import django
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Set up Django environment
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'coastal_backend.settings')
 django.setup()
 
-from monitoring.models import CoastalLocation
+from monitoring.models import get_active_locations
 from ml_integration.services import MLPredictionService
 
+# Keep-alive session; retries cover the server still starting up
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+))
+
 def run_initial_predictions():
     """Run initial predictions for all locations"""
     print("Running initial risk predictions...")
     
     ml_service = MLPredictionService()
-    locations = CoastalLocation.objects.filter(is_active=True)
+    locations = get_active_locations()
+    
+    try:
+        # Score every location in one batched pass, keyed by station id
+        predictions = ml_service.predict_all_locations()
+    except Exception as e:
+        print(f"✗ Error - {str(e)}")
+        return
     
     for location in locations:
-        try:
-            prediction = ml_service.predict_risk(location)
-            if prediction:
-                print(f"✓ {location.name}: Risk Level = {prediction['risk_level']}, Score = {prediction['risk_score']:.3f}")
-            else:
-                print(f"✗ {location.name}: Prediction failed")
-        except Exception as e:
-            print(f"✗ {location.name}: Error - {str(e)}")
+        prediction = predictions.get(location.station_id)
+        if prediction:
+            print(f"✓ {location.name}: Risk Level = {prediction.risk_level}, Score = {prediction.risk_score:.3f}")
+        else:
+            print(f"✗ {location.name}: Prediction failed")
 
 def check_system_health():
     """Check if the system is running properly"""
     try:
-        response = requests.get('http://localhost:8000/api/health/', timeout=5)
+        response = SESSION.get('http://localhost:8000/api/health/', timeout=5)
         if response.status_code == 200:
             print("✓ System health check passed")
             return True
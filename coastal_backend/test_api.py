@@ -8,9 +8,18 @@ import requests
 import json
 import time
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "http://localhost:8000/api"
 
+# One keep-alive connection pool for every test request
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+))
+
 def test_endpoint(method, endpoint, data=None, description=""):
     """Test an API endpoint and print results"""
     url = f"{BASE_URL}{endpoint}"
@@ -21,9 +30,9 @@ def test_endpoint(method, endpoint, data=None, description=""):
     
     try:
         if method == "GET":
-            response = requests.get(url)
+            response = SESSION.get(url)
         elif method == "POST":
-            response = requests.post(url, json=data, headers={'Content-Type': 'application/json'})
+            response = SESSION.post(url, json=data, headers={'Content-Type': 'application/json'})
         
         print(f"Status: {response.status_code}")
         
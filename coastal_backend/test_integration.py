@@ -10,93 +10,210 @@ import subprocess
 import time
 import threading
 import os
-from datetime import datetime
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 BACKEND_URL = "http://localhost:8000"
 FRONTEND_URL = "http://localhost:3000"
 
+# Backend URLs, joined once
+HEALTH_URL = f"{BACKEND_URL}/api/health/"
+DASHBOARD_URL = f"{BACKEND_URL}/api/dashboard/"
+LOCATIONS_URL = f"{BACKEND_URL}/api/locations/"
+SENSOR_DATA_URL = f"{BACKEND_URL}/api/sensor-data/"
+ACTIVE_ALERTS_URL = f"{BACKEND_URL}/api/alerts/active/"
+
+# API endpoints the frontend uses, as (method, path, url, description)
+ENDPOINTS = tuple(
+    (method, path, f"{BACKEND_URL}{path}", description)
+    for method, path, description in (
+        ("GET", "/api/health/", "Health Check"),
+        ("GET", "/api/dashboard/", "Dashboard Data"),
+        ("GET", "/api/locations/", "Locations List"),
+        ("GET", "/api/sensor-data/?hours=1", "Recent Sensor Data"),
+        ("GET", "/api/alerts/active/", "Active Alerts"),
+        ("GET", "/api/risk-assessments/?hours=24", "Risk Assessments"),
+    )
+)
+# (connect, read) timeouts in seconds: a service that is down fails the connect
+# in half a second, while slow responses still get their full read time
+CONNECT_TIMEOUT = 0.5
+TIMEOUT = (CONNECT_TIMEOUT, 5.0)
+SLOW_TIMEOUT = (CONNECT_TIMEOUT, 10.0)  # endpoint probes and ML prediction
+# Seconds to wait for a buffered reading to be flushed to the database
+BUFFER_FLUSH_TIMEOUT = 15.0
+# Keep-alive connections per host; concurrent probes never use more than this,
+# so every connection they open is kept for the next phase
+MAX_CONNECTIONS = 20
+
+def parse_json(response):
+    """Decode a response body with orjson when it is installed
+    
+    Both decoders raise a ValueError subclass on invalid JSON.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+def _write_lines(lines):
+    """Write the buffered lines to stdout in one call and empty the buffer"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
+
 class IntegrationTester:
     def __init__(self):
         self.backend_running = False
         self.frontend_running = False
+        # One keep-alive connection pool per host for every request the tester makes
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONNECTIONS, max_retries=0))
+        # Threads that overlap independent requests; at most one per pooled connection
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS)
+        # Recent GET responses by URL, as (fetched_at, response); see _cached_get
+        self._cache = {}
+        # Results of test_api_endpoints, which runs at most once per tester
+        self._endpoint_results = None
+        # Monotonic time until which a passed CORS check stays valid, from the
+        # preflight's Access-Control-Max-Age; None when the header was missing
+        self._cors_valid_until = 0.0
+    
+    def _cached_get(self, url, ttl=5.0, timeout=SLOW_TIMEOUT):
+        """GET url, reusing a response fetched less than ttl seconds ago
+        
+        Used for the endpoints that several test phases read, such as health
+        and locations, so each is requested once per run.
+        """
+        cached = self._cache.get(url)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        
+        response = self.session.get(url, timeout=timeout)
+        self._cache[url] = (time.monotonic(), response)
+        return response
+    
+    def close(self):
+        """Stop the request threads and close the pooled connections"""
+        self.executor.shutdown()
+        self.session.close()
     
     def check_backend(self):
         """Check if Django backend is running"""
+        # Runs alongside check_frontend; one write per message keeps lines whole
         try:
-            response = requests.get(f"{BACKEND_URL}/api/health/", timeout=5)
+            response = self._cached_get(HEALTH_URL, timeout=TIMEOUT)
             if response.status_code == 200:
-                print("✅ Django backend is running")
+                _write_lines(["✅ Django backend is running"])
                 self.backend_running = True
                 return True
             else:
-                print(f"❌ Backend health check failed: {response.status_code}")
+                _write_lines([f"❌ Backend health check failed: {response.status_code}"])
                 return False
         except requests.RequestException:
-            print("❌ Django backend is not running")
+            _write_lines(["❌ Django backend is not running"])
             return False
     
     def check_frontend(self):
         """Check if React frontend is accessible"""
         try:
-            response = requests.get(FRONTEND_URL, timeout=5)
+            response = self.session.get(FRONTEND_URL, timeout=TIMEOUT)
             if response.status_code == 200:
-                print("✅ React frontend is accessible")
+                _write_lines(["✅ React frontend is accessible"])
                 self.frontend_running = True
                 return True
             else:
-                print(f"❌ Frontend check failed: {response.status_code}")
+                _write_lines([f"❌ Frontend check failed: {response.status_code}"])
                 return False
         except requests.RequestException:
-            print("❌ React frontend is not running")
+            _write_lines(["❌ React frontend is not running"])
             return False
     
     def test_api_endpoints(self):
-        """Test all API endpoints that the frontend uses"""
+        """Test all API endpoints that the frontend uses
+        
+        The results are kept on the tester, so calling this again (for
+        example from a second generate_report) sends no requests.
+        """
+        if not self.backend_running:
+            return []
+        if self._endpoint_results is not None:
+            return self._endpoint_results
+        
         print("\n🔍 Testing API endpoints...")
         
-        endpoints_to_test = [
-            ("GET", "/api/health/", "Health Check"),
-            ("GET", "/api/dashboard/", "Dashboard Data"),
-            ("GET", "/api/locations/", "Locations List"),
-            ("GET", "/api/sensor-data/?hours=1", "Recent Sensor Data"),
-            ("GET", "/api/alerts/active/", "Active Alerts"),
-            ("GET", "/api/risk-assessments/?hours=24", "Risk Assessments"),
-        ]
+        # The endpoints are independent, so request them all at once; the total
+        # wait is the slowest response rather than the sum of all of them
+        outcomes = list(self.executor.map(self._fetch_endpoint, [url for _, _, url, _ in ENDPOINTS]))
         
         results = []
         
-        for method, endpoint, description in endpoints_to_test:
-            try:
-                response = requests.get(f"{BACKEND_URL}{endpoint}", timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"✅ {description}: {response.status_code}")
-                    results.append({
-                        'endpoint': endpoint,
-                        'status': 'success',
-                        'data_keys': list(data.keys()) if isinstance(data, dict) else f"{len(data)} items"
-                    })
-                else:
-                    print(f"❌ {description}: {response.status_code}")
+        for (method, endpoint, url, description), (response, error) in zip(ENDPOINTS, outcomes):
+            if error is not None:
+                print(f"❌ {description}: {str(error)}")
+                results.append({
+                    'endpoint': endpoint,
+                    'status': 'error',
+                    'error': str(error)
+                })
+            elif response.status_code == 200:
+                try:
+                    data = parse_json(response)
+                except ValueError as e:
+                    print(f"❌ {description}: invalid JSON ({str(e)})")
                     results.append({
                         'endpoint': endpoint,
-                        'status': 'failed',
-                        'error': f"Status {response.status_code}"
+                        'status': 'error',
+                        'error': f"Invalid JSON: {str(e)}"
                     })
-            except Exception as e:
-                print(f"❌ {description}: {str(e)}")
+                    continue
+                print(f"✅ {description}: {response.status_code}")
                 results.append({
                     'endpoint': endpoint,
-                    'status': 'error',
-                    'error': str(e)
+                    'status': 'success',
+                    'data_keys': list(data.keys()) if isinstance(data, dict) else f"{len(data)} items"
+                })
+            else:
+                print(f"❌ {description}: {response.status_code}")
+                results.append({
+                    'endpoint': endpoint,
+                    'status': 'failed',
+                    'error': f"Status {response.status_code}"
                 })
         
+        self._endpoint_results = results
         return results
     
+    def _fetch_endpoint(self, url):
+        """GET one backend endpoint, returning (response, None) or (None, error)"""
+        try:
+            return self._cached_get(url, timeout=SLOW_TIMEOUT), None
+        except Exception as e:
+            return None, e
+    
     def test_cors_configuration(self):
-        """Test CORS configuration for frontend-backend communication"""
+        """Test CORS configuration for frontend-backend communication
+        
+        A passed check is reused for as long as the preflight response says
+        browsers may cache it (Access-Control-Max-Age).
+        """
+        if not self.backend_running:
+            return False
+        
         print("\n🌐 Testing CORS configuration...")
         
+        if self._cors_valid_until and time.monotonic() < self._cors_valid_until:
+            print("✅ CORS preflight still cached (Access-Control-Max-Age), skipping")
+            return True
+        
         headers = {
             'Origin': FRONTEND_URL,
             'Access-Control-Request-Method': 'GET',
@@ -104,14 +221,25 @@ class IntegrationTester:
         }
         
         try:
+            # Send the preflight and the actual request with Origin together;
+            # neither depends on the other's response
+            actual = self.executor.submit(
+                self.session.get, DASHBOARD_URL, headers={'Origin': FRONTEND_URL}, timeout=TIMEOUT
+            )
+            
             # Test preflight request
-            response = requests.options(f"{BACKEND_URL}/api/dashboard/", headers=headers, timeout=5)
+            response = self.session.options(DASHBOARD_URL, headers=headers, timeout=TIMEOUT)
             
             cors_headers = {
                 'Access-Control-Allow-Origin': response.headers.get('Access-Control-Allow-Origin'),
                 'Access-Control-Allow-Methods': response.headers.get('Access-Control-Allow-Methods'),
                 'Access-Control-Allow-Headers': response.headers.get('Access-Control-Allow-Headers'),
+                'Access-Control-Max-Age': response.headers.get('Access-Control-Max-Age'),
             }
+            try:
+                max_age = int(cors_headers['Access-Control-Max-Age'] or 0)
+            except ValueError:
+                max_age = 0
             
             print("CORS Headers received:")
             for header, value in cors_headers.items():
@@ -121,9 +249,10 @@ class IntegrationTester:
                     print(f"  ❌ {header}: Not set")
             
             # Test actual request with Origin
-            response = requests.get(f"{BACKEND_URL}/api/dashboard/", headers={'Origin': FRONTEND_URL}, timeout=5)
+            response = actual.result()
             if response.status_code == 200:
                 print("✅ CORS configuration appears to be working")
+                self._cors_valid_until = time.monotonic() + max_age if max_age > 0 else None
                 return True
             else:
                 print(f"❌ CORS test failed: {response.status_code}")
@@ -135,16 +264,21 @@ class IntegrationTester:
     
     def test_data_flow(self):
         """Test the complete data flow: sensor data → ML prediction → alerts"""
+        if not self.backend_running:
+            return False
+        
         print("\n🔄 Testing complete data flow...")
         
         try:
             # 1. Get a location
-            locations_response = requests.get(f"{BACKEND_URL}/api/locations/", timeout=5)
+            locations_response = self._cached_get(LOCATIONS_URL, timeout=TIMEOUT)
             if locations_response.status_code != 200:
                 print("❌ Failed to get locations")
                 return False
             
-            locations = locations_response.json()
+            locations = parse_json(locations_response)
+            if isinstance(locations, dict):
+                locations = locations.get('results', [])  # paginated list
             if not locations:
                 print("❌ No locations found")
                 return False
@@ -154,36 +288,51 @@ class IntegrationTester:
             print(f"✅ Using location: {location_name}")
             
             # 2. Add test sensor data
+            reading_time = datetime.now(timezone.utc).replace(microsecond=0)
             sensor_data = {
                 "location": location_id,
                 "measurement_type": "water_level",
                 "value": 5.5,  # High value to potentially trigger alert
                 "unit": "meters",
-                "timestamp": datetime.now().isoformat() + "Z",
+                "timestamp": reading_time.isoformat(),
                 "data_source": "integration_test"
             }
             
-            sensor_response = requests.post(
-                f"{BACKEND_URL}/api/sensor-data/",
+            # Active alerts before the prediction, to tell when a new one appears;
+            # counted while the sensor data is being posted
+            alerts_before = self.executor.submit(self._count_active_alerts)
+            
+            sensor_response = self.session.post(
+                SENSOR_DATA_URL,
                 json=sensor_data,
                 headers={'Content-Type': 'application/json'},
-                timeout=5
+                timeout=TIMEOUT
             )
             
             if sensor_response.status_code == 201:
                 print("✅ Sensor data added successfully")
+            elif sensor_response.status_code == 202:
+                # The backend buffers posted readings (SENSOR_DATA_BUFFER_URL) and
+                # flush_sensor_buffer stores them a few seconds later
+                if self._wait_for_reading(location_id, reading_time):
+                    print("✅ Sensor data queued and stored")
+                else:
+                    print(f"❌ Queued sensor data not stored within {BUFFER_FLUSH_TIMEOUT:.0f}s - is flush_sensor_buffer scheduled?")
+                    return False
             else:
                 print(f"❌ Failed to add sensor data: {sensor_response.status_code}")
                 return False
             
+            alerts_before = alerts_before.result()
+            
             # 3. Trigger ML prediction
-            prediction_response = requests.post(
-                f"{BACKEND_URL}/api/locations/{location_id}/run_prediction/",
-                timeout=10
+            prediction_response = self.session.post(
+                f"{LOCATIONS_URL}{location_id}/run_prediction/",
+                timeout=SLOW_TIMEOUT
             )
             
             if prediction_response.status_code == 200:
-                prediction_data = prediction_response.json()
+                prediction_data = parse_json(prediction_response)
                 print(f"✅ ML prediction successful: {prediction_data}")
                 
                 # Check if prediction makes sense
@@ -196,12 +345,15 @@ class IntegrationTester:
                 print(f"❌ ML prediction failed: {prediction_response.status_code}")
                 return False
             
-            # 4. Check for generated alerts
-            time.sleep(1)  # Give system time to process
-            alerts_response = requests.get(f"{BACKEND_URL}/api/alerts/active/", timeout=5)
+            # 4. Check for generated alerts, as soon as a new one shows up; the
+            # prediction may not raise one, so give up after a second
+            alerts_response = self._wait_until(
+                lambda: self.session.get(ACTIVE_ALERTS_URL, timeout=TIMEOUT),
+                lambda response: response.status_code != 200 or len(parse_json(response)) > alerts_before
+            )
             
             if alerts_response.status_code == 200:
-                alerts = alerts_response.json()
+                alerts = parse_json(alerts_response)
                 print(f"✅ Retrieved {len(alerts)} active alerts")
                 
                 if alerts:
@@ -220,55 +372,107 @@ class IntegrationTester:
             print(f"❌ Data flow test error: {str(e)}")
             return False
     
+    def _count_active_alerts(self):
+        """Number of active alerts, or 0 if they cannot be fetched"""
+        try:
+            response = self.session.get(ACTIVE_ALERTS_URL, timeout=TIMEOUT)
+            return len(parse_json(response)) if response.status_code == 200 else 0
+        except (requests.RequestException, ValueError):
+            return 0
+    
+    def _wait_for_reading(self, location_id, reading_time):
+        """Wait until the data flow's buffered reading shows up in the sensor data list"""
+        def stored(response):
+            if response.status_code != 200:
+                return False
+            return any(
+                reading['data_source'] == "integration_test"
+                and datetime.fromisoformat(reading['timestamp'].replace("Z", "+00:00")) == reading_time
+                for reading in parse_json(response)['results']
+            )
+        
+        response = self._wait_until(
+            lambda: self.session.get(
+                SENSOR_DATA_URL,
+                params={'location': location_id, 'measurement_type': 'water_level', 'hours': 1},
+                timeout=TIMEOUT
+            ),
+            stored, timeout=BUFFER_FLUSH_TIMEOUT, interval=0.25
+        )
+        return stored(response)
+    
+    def _wait_until(self, fetch, done, timeout=1.0, interval=0.05):
+        """Call fetch until done(result) is true or timeout seconds pass; return the last result"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = fetch()
+            if done(result) or time.monotonic() >= deadline:
+                return result
+            time.sleep(interval)
+    
     def generate_report(self):
-        """Generate a comprehensive integration report"""
-        print("\n" + "=" * 60)
-        print("📋 INTEGRATION TEST REPORT")
-        print("=" * 60)
+        """Generate a comprehensive integration report
+        
+        Report lines are collected and written in one call between test
+        phases, which print their own progress as they run.
+        """
+        lines = []
+        lines.append("\n" + "=" * 60)
+        lines.append("📋 INTEGRATION TEST REPORT")
+        lines.append("=" * 60)
         
         # System status
-        print("\n🖥️ System Status:")
-        print(f"  Django Backend: {'✅ Running' if self.backend_running else '❌ Not Running'}")
-        print(f"  React Frontend: {'✅ Running' if self.frontend_running else '❌ Not Running'}")
+        lines.append("\n🖥️ System Status:")
+        lines.append(f"  Django Backend: {'✅ Running' if self.backend_running else '❌ Not Running'}")
+        lines.append(f"  React Frontend: {'✅ Running' if self.frontend_running else '❌ Not Running'}")
         
-        # API endpoints
-        if self.backend_running:
+        # The API, CORS and data flow suites all need the backend; skip them
+        # together rather than letting each one time out
+        if not self.backend_running:
+            lines.append("\n⏭️ Backend unreachable - skipping API endpoint, CORS and data flow tests")
+        else:
+            # API endpoints
+            _write_lines(lines)
             results = self.test_api_endpoints()
             successful_endpoints = sum(1 for r in results if r['status'] == 'success')
             total_endpoints = len(results)
             
-            print(f"\n🔌 API Endpoints: {successful_endpoints}/{total_endpoints} working")
+            lines.append(f"\n🔌 API Endpoints: {successful_endpoints}/{total_endpoints} working")
             
             for result in results:
                 status_icon = "✅" if result['status'] == 'success' else "❌"
-                print(f"  {status_icon} {result['endpoint']}")
-        
-        # CORS test
-        if self.backend_running:
+                lines.append(f"  {status_icon} {result['endpoint']}")
+            
+            # CORS test
+            _write_lines(lines)
             cors_working = self.test_cors_configuration()
-            print(f"\n🌐 CORS Configuration: {'✅ Working' if cors_working else '❌ Issues detected'}")
-        
-        # Data flow test
-        if self.backend_running:
+            lines.append(f"\n🌐 CORS Configuration: {'✅ Working' if cors_working else '❌ Issues detected'}")
+            
+            # Data flow test
+            _write_lines(lines)
             data_flow_working = self.test_data_flow()
-            print(f"\n🔄 Data Flow: {'✅ Working' if data_flow_working else '❌ Issues detected'}")
+            lines.append(f"\n🔄 Data Flow: {'✅ Working' if data_flow_working else '❌ Issues detected'}")
         
         # Recommendations
-        print("\n💡 Recommendations:")
+        lines.append("\n💡 Recommendations:")
         
         if not self.backend_running:
-            print("  🔧 Start Django backend: cd coastal_backend && python start_system.py")
+            lines.append("  🔧 Start Django backend: cd coastal_backend && python start_system.py")
         
         if not self.frontend_running:
-            print("  🔧 Start React frontend: cd coastal-dashboard && npm start")
+            lines.append("  🔧 Start React frontend: cd coastal-dashboard && npm start")
+        
+        if self.backend_running and self._cors_valid_until is None:
+            lines.append("  🔧 Set CORS_PREFLIGHT_MAX_AGE so browsers cache preflights instead of sending one per request")
         
         if self.backend_running and self.frontend_running:
-            print("  ✨ Both systems are running! Your integration should work.")
-            print("  🌐 Frontend: http://localhost:3000")
-            print("  🔧 Backend: http://localhost:8000")
-            print("  📊 Admin: http://localhost:8000/admin/")
+            lines.append("  ✨ Both systems are running! Your integration should work.")
+            lines.append("  🌐 Frontend: http://localhost:3000")
+            lines.append("  🔧 Backend: http://localhost:8000")
+            lines.append("  📊 Admin: http://localhost:8000/admin/")
         
-        print("\n" + "=" * 60)
+        lines.append("\n" + "=" * 60)
+        _write_lines(lines)
 
 def main():
     print("🚀 Starting Frontend-Backend Integration Test")
@@ -276,12 +480,13 @@ def main():
     
     tester = IntegrationTester()
     
-    # Check if systems are running
-    tester.check_backend()
-    tester.check_frontend()
+    # Check if systems are running, both at once so a service that is down
+    # costs one timeout rather than two
+    list(tester.executor.map(lambda check: check(), [tester.check_backend, tester.check_frontend]))
     
     # Generate comprehensive report
     tester.generate_report()
+    tester.close()
     
     # Instructions for next steps
     if tester.backend_running and tester.frontend_running: